@@ -0,0 +1,134 @@
+"""Run many pure analyses per request on a thread or process pool, streaming NDJSON results."""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from .config import settings
+from .schemas import BatchJobIn, BCGColumnsIn, PorterBatchIn, PorterForcesIn, ProductIn, SuggestSWOTIn, SWOTIn
+from .services.ai_suggest import suggest_swot
+from .services.bcg import classify_bcg, classify_bcg_columns
+from .services.porter import forces_index, score_columns
+from .services.swot import build_swot
+
+
+def _bcg_columnar(body: BCGColumnsIn):
+    return classify_bcg_columns(body.name, body.market_share, body.largest_rival_share, body.market_growth_rate,
+                                growth_threshold=body.growth_threshold, rms_threshold=body.rms_threshold)
+
+
+def _porter_batch(body: PorterBatchIn):
+    if body.profile:
+        raise ValueError("stored profiles are not available in /analyze/batch; pass 'weights'")
+    return {"companies": body.companies, **score_columns(body.scores, len(body.companies), body.weights)}
+
+
+# kind -> (input adapter, service function); mirrors the single-analysis endpoints
+JOBS: Dict[str, Tuple[TypeAdapter, Callable[[Any], Any]]] = {
+    "bcg": (TypeAdapter(List[ProductIn]), classify_bcg),
+    "bcg_columnar": (TypeAdapter(BCGColumnsIn), _bcg_columnar),
+    "swot": (TypeAdapter(SWOTIn), build_swot),
+    "porter": (TypeAdapter(PorterForcesIn), forces_index),
+    "porter_batch": (TypeAdapter(PorterBatchIn), _porter_batch),
+    "ai_suggest_swot": (TypeAdapter(SuggestSWOTIn), suggest_swot),
+}
+
+
+def run_job(kind: str, payload: Any) -> Any:
+    """Validate and compute one job. Top-level so it can be pickled into a process pool."""
+    adapter, fn = JOBS[kind]
+    return jsonable_encoder(fn(adapter.validate_python(payload)))
+
+
+_executor: Optional[Executor] = None
+_slots: Optional[asyncio.Semaphore] = None  # one per pool worker; see run_pooled
+
+
+def _pool_size() -> int:
+    if settings.BATCH_EXECUTOR == "process":
+        # Default: share the cores with the other web workers instead of one process per core each
+        return settings.BATCH_WORKERS or max(1, (os.cpu_count() or 1) // max(1, settings.WEB_CONCURRENCY))
+    return settings.BATCH_WORKERS or min(32, (os.cpu_count() or 1) + 4)  # ThreadPoolExecutor's default
+
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if settings.BATCH_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=_pool_size())
+        else:
+            _executor = ThreadPoolExecutor(max_workers=_pool_size(), thread_name_prefix="analyze")
+    return _executor
+
+
+def forget_executor() -> None:
+    """In a forked worker: the parent's pool threads/processes don't exist here; start a fresh one on demand."""
+    global _executor, _slots
+    _executor, _slots = None, None
+
+
+def shutdown_executor() -> None:
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor, _slots = None, None
+
+
+async def run_pooled(kind: str, payload: Any, timeout: float,
+                     on_start: Optional[Callable[[], Awaitable[None]]] = None) -> Any:
+    """run_job on the pool; raises asyncio.TimeoutError past `timeout`. `on_start` runs as the job starts.
+
+    Callers wait here for a free pool worker before submitting, so the timeout and the run time start
+    when the job does: time queued behind other jobs (of this batch or any other) counts against
+    neither. A timed-out job's worker keeps running to completion and holds its slot until then."""
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(_pool_size())
+    slots = _slots
+    await slots.acquire()
+    try:
+        if on_start is not None:
+            await on_start()
+        fut = asyncio.get_running_loop().run_in_executor(get_executor(), run_job, kind, payload)
+    except BaseException:
+        slots.release()
+        raise
+    fut.add_done_callback(lambda _: slots.release())
+    # shield: a timeout or cancellation here must not look like the pool worker being free again
+    return await asyncio.wait_for(asyncio.shield(fut), timeout)
+
+
+async def _run_one(index: int, job: BatchJobIn, timeout: float) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"index": index, "id": job.id, "kind": job.kind}
+    started = None
+
+    async def mark_start():
+        nonlocal started
+        started = time.perf_counter()
+    try:
+        result = await run_pooled(job.kind, job.payload, timeout, mark_start)
+        out.update(ok=True, result=result)
+    except asyncio.TimeoutError:
+        out.update(ok=False, error=f"timed out after {timeout}s")
+    except Exception as e:
+        out.update(ok=False, error=f"{type(e).__name__}: {e}")
+    # Run time only (from the moment a pool worker took the job), not time spent queued
+    out["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3) if started is not None else 0.0
+    return out
+
+
+async def run_batch(jobs: List[BatchJobIn], timeout: Optional[float] = None) -> AsyncIterator[bytes]:
+    """Yield one NDJSON line per job in completion order; failures are reported, never raised."""
+    timeout = timeout or settings.BATCH_JOB_TIMEOUT
+    pending = [asyncio.ensure_future(_run_one(i, j, timeout)) for i, j in enumerate(jobs)]
+    try:
+        for fut in asyncio.as_completed(pending):
+            yield (json.dumps(await fut, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+    finally:
+        for fut in pending:
+            fut.cancel()
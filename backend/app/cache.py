@@ -0,0 +1,226 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from pydantic_core import to_jsonable_python
+
+from .config import settings
+from .fastjson import orjson
+
+# Bump when any services/* output changes so shared caches don't serve stale results across deploys
+CACHE_VERSION = "4"
+
+
+def canonical_key(kind: str, payload: Any) -> str:
+    """Content address of a validated request body: sha256 over sorted, compact JSON."""
+    # to_jsonable_python is pydantic-core's (Rust) equivalent of jsonable_encoder: much faster on big columns
+    data = to_jsonable_python(payload)
+    if orjson is not None:
+        raw = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    else:
+        raw = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(f"{CACHE_VERSION}:{kind}\n".encode() + raw).hexdigest()
+
+
+def render_json(content: Any) -> bytes:
+    # Same encoding as fastapi.responses.JSONResponse, so cached bytes match uncached responses
+    return json.dumps(to_jsonable_python(content), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class SqliteCacheBackend:
+    """Shared second level: one SQLite file visible to every worker on the host.
+
+    Expired rows are deleted when read, and at most every PURGE_INTERVAL seconds a write also purges
+    all expired rows and trims the table to `max_bytes` of values, soonest-expiring first (with one
+    TTL for every entry, that is the oldest written)."""
+
+    PURGE_INTERVAL = 30.0
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS result_cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_result_cache_expires ON result_cache (expires_at)")
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM result_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] < now:
+                self._conn.execute("DELETE FROM result_cache WHERE key = ? AND expires_at < ?", (key, now))
+                return None
+        return row[0] if row is not None else None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO result_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                               (key, value, now + ttl))
+            if now >= self._next_purge:
+                self._next_purge = now + self.PURGE_INTERVAL
+                self._purge(now)
+
+    def _purge(self, now: float) -> None:
+        self._conn.execute("DELETE FROM result_cache WHERE expires_at < ?", (now,))
+        self._conn.execute(
+            "DELETE FROM result_cache WHERE key IN (SELECT key FROM (SELECT key, SUM(length(value)) "
+            "OVER (ORDER BY expires_at DESC, key) AS kept FROM result_cache) WHERE kept > ?)", (self.max_bytes,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM result_cache")
+
+
+class RedisCacheBackend:
+    def __init__(self, url: str):
+        import redis  # optional dependency, only needed for redis:// backends
+        self._r = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._r.get(f"bizcache:{key}")
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._r.set(f"bizcache:{key}", value, ex=max(1, int(ttl)))
+
+    def clear(self) -> None:
+        for k in self._r.scan_iter("bizcache:*"):
+            self._r.delete(k)
+
+
+def make_backend(url: Optional[str]):
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SqliteCacheBackend(url[len("sqlite:///"):], max_bytes=settings.CACHE_SHARED_MAX_BYTES)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend(url)
+    raise ValueError(f"Unsupported CACHE_BACKEND_URL: {url}")
+
+
+class ResultCache:
+    """In-process LRU of rendered JSON bytes with entry/byte limits and TTL, over an optional shared backend."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 300.0, backend=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.backend = backend
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _drop(self, key: str) -> None:
+        value, _ = self._data.pop(key)
+        self._bytes -= len(value)
+
+    def _put_local(self, key: str, value: bytes, expires_at: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        if key in self._data:
+            self._drop(key)
+        self._data[key] = (value, expires_at)
+        self._bytes += len(value)
+        while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._data)))
+            self.stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None:
+                if hit[1] >= now:
+                    self._data.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return hit[0]
+                self._drop(key)
+                self.stats["expirations"] += 1
+        if self.backend is not None:
+            try:
+                value = self.backend.get(key)
+            except Exception as e:
+                print(f"Warning: shared cache read failed: {e}")
+                value = None
+            if value is not None:
+                with self._lock:
+                    self._put_local(key, value, now + self.ttl)
+                    self.stats["shared_hits"] += 1
+                return value
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._put_local(key, value, time.time() + self.ttl)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value, self.ttl)
+            except Exception as e:
+                print(f"Warning: shared cache write failed: {e}")
+
+    def reopen_backend(self) -> None:
+        """In a forked worker: a SQLite handle must not cross a fork (redis-py reconnects by itself)."""
+        if isinstance(self.backend, SqliteCacheBackend):
+            self.backend = SqliteCacheBackend(self.backend.path, self.backend.max_bytes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+        if self.backend is not None:
+            self.backend.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "entries": len(self._data), "bytes": self._bytes,
+                    "max_entries": self.max_entries, "max_bytes": self.max_bytes, "ttl": self.ttl,
+                    "shared_backend": type(self.backend).__name__ if self.backend else None}
+
+
+result_cache = ResultCache(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    ttl=settings.CACHE_TTL_SECONDS,
+    backend=make_backend(settings.CACHE_BACKEND_URL),
+)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    return inm.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in inm.split(",")]
+
+
+def cached_response(request: Request, kind: str, payload: Any, compute: Callable[[], Any],
+                    render: Callable[[Any], bytes] = render_json) -> Response:
+    """Serve a pure analysis result by content address.
+
+    The ETag is the input hash, so a matching If-None-Match returns 304 before any lookup or compute.
+    `render` defaults to FastAPI's exact encoding; columnar endpoints pass fastjson.dumps.
+    """
+    if not settings.CACHE_ENABLED:
+        return Response(content=render(compute()), media_type="application/json")
+    key = canonical_key(kind, payload)
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    body = result_cache.get(key)
+    if body is None:
+        body = render(compute())
+        result_cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -23,6 +23,51 @@ class Settings(BaseSettings):
     AI_ENABLED: bool = False  # flip to True when wiring a provider
     LLM_PROVIDER: str | None = None  # e.g., "openai" or "azure_openai"
     LLM_API_KEY: str | None = None
+    # Connection pool (per process); ignored for the SQLite fallback
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 300
+    DB_CONNECT_TIMEOUT: int = 10
+    # Multi-worker deploys (gunicorn.conf.py exports WEB_CONCURRENCY): the connection budget across all
+    # workers, e.g. PostgreSQL max_connections minus reserved slots; caps each worker's pool
+    WEB_CONCURRENCY: int = 1
+    DB_MAX_CONNECTIONS: int | None = None
+    # On SIGTERM, running background jobs get this long to finish before they are re-queued
+    SHUTDOWN_DRAIN_SECONDS: float = 15.0
+    # Readiness probe for DATABASE_URL: wait this long at startup, then retry in the background
+    DB_PROBE_STARTUP_TIMEOUT: float = 1.0
+    DB_PROBE_INITIAL_BACKOFF: float = 0.5
+    DB_PROBE_MAX_BACKOFF: float = 30.0
+    # Optional read replica for GET endpoints (app/replica.py)
+    DATABASE_REPLICA_URL: str | None = None
+    REPLICA_STICKY_SECONDS: float = 5.0  # a client's reads stay on the primary this long after its write
+    REPLICA_MAX_LAG_SECONDS: float = 2.0  # PostgreSQL replay lag beyond which reads go to the primary
+    REPLICA_CHECK_INTERVAL: float = 5.0
+    # `python -m app.migrate` builds covering indexes for the /summary rollups (drops them when False)
+    ROLLUP_INDEXES: bool = True
+    # /export/*: rows fetched from the server-side cursor and encoded per chunk
+    EXPORT_BATCH_ROWS: int = 5000
+    # Result cache for the pure analysis endpoints
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_ENTRIES: int = 1024
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_TTL_SECONDS: float = 300.0
+    CACHE_BACKEND_URL: str | None = None  # e.g. "sqlite:///./cache.db" or "redis://localhost:6379/0"
+    CACHE_SHARED_MAX_BYTES: int = 256 * 1024 * 1024  # sqlite:// backend table cap (redis: use maxmemory)
+    # /analyze/batch worker pool
+    BATCH_EXECUTOR: str = "thread"  # "thread" or "process"
+    BATCH_WORKERS: int | None = None  # None = executor default (based on CPU count)
+    BATCH_JOB_TIMEOUT: float = 30.0
+    # Background jobs (POST /jobs): concurrent jobs per process, queued jobs before 503, per-job limit
+    JOB_WORKERS: int = 2
+    JOB_QUEUE_SIZE: int = 100
+    JOB_TIMEOUT: float = 900.0
+    JOB_MAX_WAIT: float = 60.0  # longest long-poll GET /jobs/{id}?wait= accepts
+    # How long an Idempotency-Key response is replayed for retries
+    IDEMPOTENCY_TTL_HOURS: float = 24.0
+    # Honour the X-Profile request header (sampling profiler); keep off in production
+    PROFILING_ENABLED: bool = False
 
     model_config = {
         "env_file": ".env"
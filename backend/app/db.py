@@ -1,69 +1,185 @@
+import asyncio
 import os
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, URL
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from typing import Optional
+from typing import Awaitable, Callable, List, Optional, AsyncIterator
+
+from .config import settings
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+SQLITE_URL = "sqlite:///./snapshots.db"
 
-# If DATABASE_URL is provided but connection fails, fallback to SQLite
-if DATABASE_URL:
-    try:
-        # Replace psycopg2:// with postgresql+psycopg:// to use the new driver
-        if DATABASE_URL.startswith("postgresql://"):
-            DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
-
-        # Test connection with a quick timeout
-        test_engine = create_engine(
-            DATABASE_URL, 
-            pool_pre_ping=True,
-            connect_args={
-                "connect_timeout": 5,
-                "application_name": "bizanalysis-backend-test"
-            }
-        )
-        
-        # Try to connect
-        with test_engine.connect() as conn:
-            conn.execute("SELECT 1")
-        
-        # If successful, use the PostgreSQL connection
-        engine = create_engine(
-            DATABASE_URL, 
-            pool_pre_ping=True,
-            pool_recycle=300,
-            connect_args={
-                "options": "-c default_transaction_isolation=read_committed",
-                "connect_timeout": 10,
-                "application_name": "bizanalysis-backend"
-            }
-        )
-        SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
-        print("Database connection configured successfully (PostgreSQL)")
-        
-    except Exception as e:
-        print(f"Warning: PostgreSQL connection failed: {e}")
-        print("Falling back to SQLite for persistence")
-        
-        # Fallback to SQLite
-        engine = create_engine("sqlite:///./snapshots.db", connect_args={"check_same_thread": False})
-        SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
-        print("Database connection configured successfully (SQLite fallback)")
-        
-else:
-    print("No DATABASE_URL provided. Using SQLite for persistence")
-    engine = create_engine("sqlite:///./snapshots.db", connect_args={"check_same_thread": False})
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
-    print("Database connection configured successfully (SQLite)")
+# Replace psycopg2:// with postgresql+psycopg:// to use the new driver
+if DATABASE_URL and DATABASE_URL.startswith("postgresql://"):
+    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
 
 class Base(DeclarativeBase):
     pass
 
-# FastAPI dependency
+def pool_limits() -> tuple[int, int]:
+    """(pool_size, max_overflow) per process. With DB_MAX_CONNECTIONS set, that budget is split across
+    WEB_CONCURRENCY workers, so all pools together stay under the server's max_connections."""
+    size, overflow = settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    if settings.DB_MAX_CONNECTIONS:
+        per_worker = max(1, settings.DB_MAX_CONNECTIONS // max(1, settings.WEB_CONCURRENCY))
+        size = min(size, per_worker)
+        overflow = max(0, min(overflow, per_worker - size))
+    return size, overflow
+
+def _pool_kwargs() -> dict:
+    size, overflow = pool_limits()
+    return {
+        "pool_pre_ping": True,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_size": size,
+        "max_overflow": overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+def _pg_connect_args(app_name: str = "bizanalysis-backend") -> dict:
+    return {
+        "options": "-c default_transaction_isolation=read_committed",
+        "connect_timeout": settings.DB_CONNECT_TIMEOUT,
+        "application_name": app_name,
+    }
+
+def async_engine_for(url: URL, app_name: str = "bizanalysis-backend") -> AsyncEngine:
+    """psycopg (async mode) for Postgres, aiosqlite for SQLite."""
+    if url.get_backend_name() == "sqlite":
+        return create_async_engine(url.set(drivername="sqlite+aiosqlite"))
+    return create_async_engine(url.set(drivername="postgresql+psycopg"),
+                               connect_args=_pg_connect_args(app_name), **_pool_kwargs())
+
+def make_async_engine(sync_engine: Engine) -> AsyncEngine:
+    """Async twin of a sync engine."""
+    return async_engine_for(sync_engine.url)
+
+class _Database:
+    """Currently active engines. Nothing connects at import; the primary is swapped in once a probe succeeds."""
+
+    def __init__(self):
+        self.engine: Optional[Engine] = None
+        self.async_engine: Optional[AsyncEngine] = None
+        self.SessionLocal: Optional[sessionmaker] = None
+        self.AsyncSessionLocal: Optional[async_sessionmaker] = None
+        self.primary_ready = False
+        self.last_probe_error: Optional[str] = None
+
+    def use(self, sync_engine: Engine) -> None:
+        self.engine = sync_engine
+        self.async_engine = make_async_engine(sync_engine)
+        self.SessionLocal = sessionmaker(bind=sync_engine, autoflush=False, autocommit=False)
+        self.AsyncSessionLocal = async_sessionmaker(bind=self.async_engine, autoflush=False, expire_on_commit=False)
+
+    def ensure(self) -> None:
+        if self.engine is None:
+            # Serve from SQLite until the primary is probed; its schema is local and cheap to create
+            self.use(create_engine(SQLITE_URL, connect_args={"check_same_thread": False}))
+            from . import models  # noqa: F401  (register tables on Base.metadata)
+            for attempt in range(5):
+                try:
+                    Base.metadata.create_all(bind=self.engine)
+                    break
+                except OperationalError:
+                    # Workers booting together race on a fresh file ("already exists", "locked"); retry sees their tables
+                    if attempt == 4:
+                        raise
+                    time.sleep(0.1 * (attempt + 1))
+            print("Database connection configured (SQLite" + (" fallback until PostgreSQL is ready)" if DATABASE_URL else ")"))
+
+_db = _Database()
+
+def dispose_inherited_pools() -> None:
+    """In a forked worker: drop pooled connections inherited from the parent without closing them
+    (they are the parent's sockets); the pools reconnect on first use."""
+    if _db.engine is not None:
+        _db.engine.dispose(close=False)
+    if _db.async_engine is not None:
+        _db.async_engine.sync_engine.dispose(close=False)
+
+def get_engine() -> Engine:
+    _db.ensure()
+    return _db.engine
+
+def get_async_engine() -> AsyncEngine:
+    _db.ensure()
+    return _db.async_engine
+
+def backend_name() -> str:
+    return get_engine().url.get_backend_name()
+
+def serving_primary() -> bool:
+    """True once sessions go to the configured primary (always, when only SQLite is configured)."""
+    return _db.primary_ready or not DATABASE_URL
+
+_primary_hooks: List[Callable[[], Awaitable[None]]] = []
+
+def on_primary_ready(hook: Callable[[], Awaitable[None]]) -> None:
+    """Await `hook()` each time new sessions switch from the SQLite fallback to the primary, to redo
+    startup work that ran against the fallback."""
+    _primary_hooks.append(hook)
+
+async def probe_primary(attempts: Optional[int] = None) -> bool:
+    """Try the PostgreSQL URL with exponential backoff; hot-switch new sessions to it on success."""
+    if not DATABASE_URL or _db.primary_ready:
+        return _db.primary_ready
+    _db.ensure()
+    delay = settings.DB_PROBE_INITIAL_BACKOFF
+    n = 0
+    while attempts is None or n < attempts:
+        n += 1
+        candidate = create_engine(DATABASE_URL, connect_args=_pg_connect_args(), **_pool_kwargs())
+        probe = make_async_engine(candidate)
+        try:
+            async with probe.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except Exception as e:
+            _db.last_probe_error = str(e)
+            print(f"Warning: PostgreSQL not ready (attempt {n}): {e}")
+            await probe.dispose()
+            candidate.dispose()
+            if attempts is not None and n >= attempts:
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.DB_PROBE_MAX_BACKOFF)
+            continue
+        old_sync, old_async = _db.engine, _db.async_engine
+        _db.engine, _db.async_engine = candidate, probe
+        _db.SessionLocal = sessionmaker(bind=candidate, autoflush=False, autocommit=False)
+        _db.AsyncSessionLocal = async_sessionmaker(bind=probe, autoflush=False, expire_on_commit=False)
+        _db.primary_ready = True
+        _db.last_probe_error = None
+        await old_async.dispose()
+        old_sync.dispose()
+        print("Database connection configured successfully (PostgreSQL)")
+        for hook in _primary_hooks:
+            try:
+                await hook()
+            except Exception as e:
+                print(f"Warning: primary-ready hook {getattr(hook, '__qualname__', hook)} failed: {e}")
+        return True
+    return False
+
+async def start_readiness_probe() -> Optional[asyncio.Task]:
+    """Give the primary a short head start, then keep probing in the background."""
+    if not DATABASE_URL:
+        _db.ensure()
+        return None
+    task = asyncio.create_task(probe_primary())
+    try:
+        await asyncio.wait_for(asyncio.shield(task), timeout=settings.DB_PROBE_STARTUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        print("PostgreSQL not reachable yet - serving from SQLite, probing in the background")
+    return task
+
+# FastAPI dependency (sync; kept for scripts and startup tasks)
 def get_db():
-    if SessionLocal is None:
-        raise RuntimeError("Database not available. Please check configuration.")
-    
-    db = SessionLocal()
+    _db.ensure()
+    db = _db.SessionLocal()
     try:
         yield db
     except Exception as e:
@@ -72,6 +188,33 @@ def get_db():
     finally:
         db.close()
 
+# FastAPI dependency used by the routes: queries never block the event loop
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    _db.ensure()
+    async with _db.AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            await db.rollback()
+            raise e
+
+def async_session() -> AsyncSession:
+    """A session outside any request (background tasks); use as `async with async_session() as db`."""
+    _db.ensure()
+    return _db.AsyncSessionLocal()
+
 # Helper function to check if database is available
 def is_database_available() -> bool:
-    return engine is not None and SessionLocal is not None
+    _db.ensure()
+    return _db.async_engine is not None
+
+def database_status() -> dict:
+    size, overflow = pool_limits()
+    return {
+        "backend": backend_name(),
+        "primary_configured": bool(DATABASE_URL),
+        "primary_ready": _db.primary_ready,
+        "pool_size": size,
+        "max_overflow": overflow,
+        "last_probe_error": _db.last_probe_error,
+    }
@@ -0,0 +1,148 @@
+"""Streamed exports (GET /export/products|markets|snapshots) as CSV, Arrow IPC or Parquet.
+
+Rows come from a server-side cursor (`yield_per`) in EXPORT_BATCH_ROWS partitions. Each partition is
+encoded and sent before the next one is fetched, so memory stays flat however many rows there are.
+Nothing goes through pydantic. Arrow and Parquet need the optional `pyarrow` package. Each partition
+becomes one Arrow record batch or Parquet row group.
+"""
+import csv
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class Col(NamedTuple):
+    expr: Any  # selectable column expression
+    type: str  # "str", "float", "int" or "time"
+    convert: Optional[Callable[[Any], Any]] = None  # applied to non-null values (e.g. UUID -> str)
+
+
+def check_format(fmt: str) -> str:
+    fmt = fmt.lower()
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"format must be one of {', '.join(MEDIA_TYPES)}")
+    if fmt != "csv":
+        try:
+            import pyarrow  # noqa: F401  (optional dependency, only needed for columnar exports)
+        except ImportError:
+            raise ValueError(f"format={fmt} needs pyarrow on the server (pip install pyarrow)")
+    return fmt
+
+
+def select_columns(available: Dict[str, Col], columns: Optional[str]) -> Dict[str, Col]:
+    """`columns=a,b` in that order; all columns when omitted."""
+    if not columns:
+        return dict(available)
+    names = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [n for n in names if n not in available]
+    if unknown or not names:
+        raise ValueError(f"unknown columns {unknown}; available: {', '.join(available)}")
+    return {n: available[n] for n in dict.fromkeys(names)}
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last take(); tell() keeps counting
+    (the Parquet footer records absolute offsets)."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def take(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def _columns(rows: Sequence[Sequence[Any]], cols: List[Col]) -> List[list]:
+    out = []
+    for i, col in enumerate(cols):
+        values = [r[i] for r in rows]
+        if col.convert is not None:
+            values = [None if v is None else col.convert(v) for v in values]
+        out.append(values)
+    return out
+
+
+class _CSVWriter:
+    def __init__(self, names: List[str], cols: List[Col]):
+        # Only columns needing conversion are touched per row; datetimes are written as ISO 8601
+        self.fix = [(i, c.convert or datetime.isoformat) for i, c in enumerate(cols) if c.convert or c.type == "time"]
+        self.buf = io.StringIO()
+        self.writer = csv.writer(self.buf, lineterminator="\n")
+        self.writer.writerow(names)
+
+    def write(self, rows) -> bytes:
+        if self.fix:
+            rows = [list(r) for r in rows]
+            for row in rows:
+                for i, f in self.fix:
+                    if row[i] is not None:
+                        row[i] = f(row[i])
+        self.writer.writerows(rows)
+        return self.take()
+
+    def take(self) -> bytes:
+        out = self.buf.getvalue().encode("utf-8")
+        self.buf.seek(0)
+        self.buf.truncate()
+        return out
+
+    def close(self) -> bytes:
+        return self.take()
+
+
+class _ArrowWriter:
+    def __init__(self, fmt: str, names: List[str], cols: List[Col]):
+        import pyarrow as pa
+        types = {"str": pa.string(), "float": pa.float64(), "int": pa.int64(), "time": pa.timestamp("us", tz="UTC")}
+        self.pa = pa
+        self.cols = cols
+        self.schema = pa.schema([(n, types[c.type]) for n, c in zip(names, cols)])
+        self.sink = _Sink()
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(self.sink, self.schema, compression="zstd")
+        else:
+            self.writer = pa.ipc.new_stream(self.sink, self.schema)
+
+    def write(self, rows) -> bytes:
+        arrays = [self.pa.array(values, type=t) for values, t in zip(_columns(rows, self.cols), self.schema.types)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        return self.sink.take()
+
+    def close(self) -> bytes:
+        self.writer.close()
+        return self.sink.take()
+
+
+async def stream_rows(db: AsyncSession, query, columns: Dict[str, Col], fmt: str, batch: int) -> AsyncIterator[bytes]:
+    """Encode `query` (selecting exactly the `columns` expressions) chunk by chunk; closes `db` when done."""
+    names, cols = list(columns), list(columns.values())
+    try:
+        writer = _CSVWriter(names, cols) if fmt == "csv" else _ArrowWriter(fmt, names, cols)
+        result = await db.stream(query.execution_options(yield_per=batch))
+        async for rows in result.partitions():
+            yield writer.write(rows)
+        yield writer.close()
+    finally:
+        await db.close()
@@ -0,0 +1,70 @@
+"""Rows -> JSON bytes without building response models.
+
+List endpoints select plain columns (numerics cast to float in SQL) and hand the tuples here; the
+bytes go out in a JSONBytesResponse, so FastAPI's response_model validation/serialization is skipped.
+orjson is used when installed, otherwise the stdlib encoder with the same compact format. UTC datetimes end
+in "Z" either way, as pydantic writes them on the response_model endpoints.
+"""
+import json
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Iterable, Sequence
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib fallback
+    orjson = None
+
+
+def _default(v: Any) -> Any:
+    if isinstance(v, Decimal):
+        return float(v)
+    if isinstance(v, uuid.UUID):
+        return str(v)
+    if isinstance(v, datetime) and v.utcoffset() == timedelta(0):
+        return v.isoformat().replace("+00:00", "Z")
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, (bytes, bytearray, memoryview)):
+        return bytes(v).decode("utf-8")
+    raise TypeError(f"Object of type {type(v).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+else:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+
+def encode_rows(rows: Iterable[Sequence[Any]], keys: Sequence[str]) -> bytes:
+    """List of objects from row tuples; `keys` gives the output field order."""
+    return dumps([dict(zip(keys, r)) for r in rows])
+
+
+def encode_rows_raw(rows: Iterable[Sequence[Any]], keys: Sequence[str], raw: str) -> bytes:
+    """Like encode_rows, but the `raw` field already holds JSON bytes and is spliced in as-is,
+    so large payloads are never decoded and re-encoded."""
+    prefixes = [(b"," if i else b"{") + dumps(k) + b":" for i, k in enumerate(keys)]
+    raw_idx = list(keys).index(raw)
+    out = bytearray(b"[")
+    for n, r in enumerate(rows):
+        if n:
+            out += b","
+        for i, (prefix, v) in enumerate(zip(prefixes, r)):
+            out += prefix
+            if i == raw_idx and v is not None:
+                out += v
+            else:
+                out += dumps(v)
+        out += b"}"
+    out += b"]"
+    return bytes(out)
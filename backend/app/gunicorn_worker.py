@@ -0,0 +1,14 @@
+"""gunicorn worker class for gunicorn.conf.py (imported by gunicorn only)."""
+from uvicorn.workers import UvicornWorker as _UvicornWorker
+
+from .config import settings
+
+
+class UvicornWorker(_UvicornWorker):
+    """Bounds the connection drain on SIGTERM. Stock UvicornWorker waits for open connections
+    indefinitely, so gunicorn SIGKILLs it at graceful_timeout before the lifespan shutdown (job
+    drain and re-queue) runs. Here in-flight requests get what is left after SHUTDOWN_DRAIN_SECONDS."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = max(1, int(self.cfg.graceful_timeout - settings.SHUTDOWN_DRAIN_SECONDS - 2))
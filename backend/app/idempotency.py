@@ -0,0 +1,51 @@
+"""Idempotency-Key support for write endpoints.
+
+The first request with a key stores its response in idempotency_keys in the same transaction as
+its writes. A retry with the same key and body gets that response back without being applied
+again. Reusing a key for a different body is an error. Keys expire after IDEMPOTENCY_TTL_HOURS.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotencyMismatch(ValueError):
+    pass
+
+
+def request_hash(body: BaseModel) -> str:
+    return hashlib.sha256(body.model_dump_json().encode()).hexdigest()
+
+
+def _expired(row: IdempotencyKey) -> bool:
+    created = row.created_at if row.created_at.tzinfo else row.created_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - created > timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+
+
+async def lookup(db: AsyncSession, key: str, endpoint: str, digest: str) -> Optional[IdempotencyKey]:
+    """The stored response for a retry, or None when the key is new (or expired)."""
+    row = await db.get(IdempotencyKey, key)
+    if row is None or _expired(row):
+        return None
+    if row.endpoint != endpoint or row.request_hash != digest:
+        raise IdempotencyMismatch(f"{IDEMPOTENCY_HEADER} '{key}' was already used for a different request")
+    return row
+
+
+async def record(db: AsyncSession, key: str, endpoint: str, digest: str, status_code: int, response: bytes) -> None:
+    """Store the response with the caller's transaction. A concurrent first use makes the commit fail."""
+    row = await db.get(IdempotencyKey, key)  # identity map: no query after lookup()
+    if row is None:
+        db.add(IdempotencyKey(key=key, endpoint=endpoint, request_hash=digest, status_code=status_code, response=response))
+        return
+    row.endpoint, row.request_hash, row.status_code, row.response = endpoint, digest, status_code, response
+    row.created_at = datetime.now(timezone.utc)
@@ -0,0 +1,110 @@
+import csv
+import json
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+BATCH_SIZE = 1000
+UUID_FIELDS = ("company_id", "market_id")
+
+
+class IngestError(ValueError):
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def detect_format(content_type: Optional[str], fmt: Optional[str] = None) -> str:
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError("format must be 'ndjson' or 'csv'")
+        return fmt
+    return "csv" if content_type and "csv" in content_type.lower() else "ndjson"
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines without buffering more than one partial line."""
+    tail = b""
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        tail += chunk
+        *lines, tail = tail.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8")
+    if tail:
+        yield tail.rstrip(b"\r").decode("utf-8")
+
+
+async def iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[tuple]:
+    """Yield (line_no, record) pairs. CSV rows must not contain embedded newlines."""
+    header: Optional[List[str]] = None
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            if len(values) != len(header):
+                raise IngestError(line_no, f"expected {len(header)} columns, got {len(values)}")
+            yield line_no, {k: (v if v != "" else None) for k, v in zip(header, values)}
+        else:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise IngestError(line_no, f"invalid JSON ({e.msg})")
+            if not isinstance(rec, dict):
+                raise IngestError(line_no, "expected a JSON object")
+            yield line_no, rec
+
+
+def prepare_row(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Coerce FK ids to UUIDs and assign a client-side primary key (no RETURNING/refresh needed)."""
+    row = dict(data)
+    for k in UUID_FIELDS:
+        if row.get(k) is not None:
+            row[k] = uuid.UUID(str(row[k]))
+    row["id"] = uuid.uuid4()
+    return row
+
+
+def to_row(schema: Type[BaseModel], line_no: int, rec: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return prepare_row(schema.model_validate(rec).model_dump())
+    except (ValidationError, ValueError) as e:
+        raise IngestError(line_no, str(e))
+
+
+async def ingest_stream(db: AsyncSession, chunks: AsyncIterator[bytes], fmt: str,
+                        schema: Type[BaseModel], model: Any,
+                        batch_size: int = BATCH_SIZE,
+                        after_batch: Optional[Callable[[List[uuid.UUID]], Awaitable[None]]] = None) -> int:
+    """Parse and insert rows in fixed-size batches; caller owns the transaction.
+
+    `after_batch` receives the ids of each inserted batch (used to keep derived tables current).
+    """
+    stmt = insert(model)
+    batch: List[Dict[str, Any]] = []
+    total = 0
+    async for line_no, rec in iter_records(chunks, fmt):
+        batch.append(to_row(schema, line_no, rec))
+        if len(batch) >= batch_size:
+            await db.execute(stmt, batch)  # multi-row VALUES on Postgres, executemany on SQLite
+            if after_batch:
+                await after_batch([r["id"] for r in batch])
+            total += len(batch)
+            batch = []
+    if batch:
+        await db.execute(stmt, batch)
+        if after_batch:
+            await after_batch([r["id"] for r in batch])
+        total += len(batch)
+    return total
@@ -0,0 +1,222 @@
+"""Background analysis jobs: POST /jobs answers at once, an in-process worker pool does the work.
+
+Each job is one AnalysisSnapshot row of kind "JOB". `note` holds the status (queued, running,
+succeeded or failed), and `payload` holds the job kind, input, timestamps and the result or error.
+So status survives restarts and is visible to every worker process. The snapshot endpoints (list,
+read, diff, export) skip these rows. Compute goes through the /analyze/batch registry and executor
+(batch.JOBS / run_job).
+
+Concurrency is JOB_WORKERS per process. At most JOB_QUEUE_SIZE jobs may wait, and submissions
+beyond that raise QueueFull (503) instead of piling up in memory. Queued jobs left behind by a
+previous process are picked up again at startup. Claiming is a conditional UPDATE, so a job runs
+once even when several processes recover it.
+
+Jobs live on the primary only. While PostgreSQL is configured but not yet reachable (sessions go to
+the SQLite fallback), submissions raise PrimaryNotReady (503) and recovery waits; it runs once the
+readiness probe switches to PostgreSQL.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import select, update
+
+from .batch import run_pooled
+from .config import settings
+from .db import async_session, on_primary_ready, serving_primary
+from .models import AnalysisSnapshot
+
+log = logging.getLogger(__name__)
+
+JOB_KIND = "JOB"
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = (SUCCEEDED, FAILED)
+POLL_INTERVAL = 1.0  # long-poll re-reads the row this often (jobs may run in another process)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class PrimaryNotReady(Exception):
+    pass
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _utc(value: datetime) -> datetime:
+    """SQLite hands DateTime(timezone=True) back naive; every stored time is UTC."""
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def job_view(row: AnalysisSnapshot) -> Dict[str, Any]:
+    """JobOut fields from a job row; a job stuck in `running` past JOB_TIMEOUT (its process died) reads as failed."""
+    p = row.payload
+    status, error = row.note, p.get("error")
+    if status == RUNNING and p.get("started_at"):
+        started = datetime.fromisoformat(p["started_at"])
+        if datetime.now(timezone.utc) - started > timedelta(seconds=settings.JOB_TIMEOUT + 60):
+            status, error = FAILED, "interrupted (worker stopped while running)"
+    return {"id": row.id, "kind": p["job_kind"], "status": status, "submitted_at": _utc(row.created_at),
+            "started_at": p.get("started_at"), "finished_at": p.get("finished_at"),
+            "result": p.get("result"), "error": error}
+
+
+class JobQueue:
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._waiting = 0  # submitted but not yet picked up by a worker
+        self._done: Dict[str, asyncio.Event] = {}
+        self._busy: Set[asyncio.Task] = set()  # workers currently running a job
+        self._closing = False
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._closing = False
+        self._workers = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(settings.JOB_WORKERS)]
+        if serving_primary():
+            await self._recover()
+
+    async def stop(self, drain: float = 0.0) -> None:
+        """Idle workers stop at once; running jobs get `drain` seconds to finish, then are cancelled
+        (and re-queued for the next process). Jobs still waiting stay queued in the database."""
+        self._closing = True
+        busy = [t for t in self._workers if t in self._busy]
+        for t in self._workers:
+            if t not in self._busy:
+                t.cancel()
+        if busy and drain > 0:
+            log.info("draining %d running jobs (up to %.0fs)", len(busy), drain)
+            await asyncio.wait(busy, timeout=drain)
+        for t in self._workers:
+            t.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": len(self._workers), "waiting": self._waiting, "capacity": settings.JOB_QUEUE_SIZE}
+
+    async def submit(self, kind: str, payload: Any) -> AnalysisSnapshot:
+        if self._queue is None:
+            raise RuntimeError("job queue not started")
+        if not serving_primary():
+            # A row written to the fallback would be lost (and never claimed) once the probe switches over
+            raise PrimaryNotReady("PostgreSQL is not reachable yet")
+        if self._waiting >= settings.JOB_QUEUE_SIZE:
+            raise QueueFull(f"{self._waiting} jobs already waiting")
+        self._waiting += 1  # reserve the slot before the insert awaits
+        try:
+            async with async_session() as db:
+                row = AnalysisSnapshot(kind=JOB_KIND, note=QUEUED, payload={"job_kind": kind, "input": payload})
+                db.add(row)
+                await db.commit()
+        except BaseException:
+            self._waiting -= 1
+            raise
+        self._enqueue(row.id)
+        return row
+
+    def _enqueue(self, job_id: str) -> None:
+        self._done.setdefault(job_id, asyncio.Event())
+        self._queue.put_nowait(job_id)
+
+    async def _recover(self) -> None:
+        async with async_session() as db:
+            ids = (await db.scalars(
+                select(AnalysisSnapshot.id).where(AnalysisSnapshot.kind == JOB_KIND, AnalysisSnapshot.note == QUEUED)
+                .order_by(AnalysisSnapshot.created_at)
+            )).all()
+        for job_id in ids:
+            self._waiting += 1
+            self._enqueue(job_id)
+        if ids:
+            log.info("re-queued %d pending jobs", len(ids))
+
+    async def _on_primary(self) -> None:
+        """The probe switched to PostgreSQL: pick up the jobs queued there (start() skipped them)."""
+        if self._queue is not None and not self._closing:
+            await self._recover()
+
+    async def _worker(self) -> None:
+        task = asyncio.current_task()
+        while not self._closing:
+            job_id = await self._queue.get()
+            self._waiting -= 1
+            self._busy.add(task)
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("job %s crashed", job_id)
+            finally:
+                self._busy.discard(task)
+                self._queue.task_done()
+                event = self._done.pop(job_id, None)
+                if event is not None:
+                    event.set()
+
+    async def _run(self, job_id: str) -> None:
+        async with async_session() as db:
+            try:
+                claimed = await db.execute(
+                    update(AnalysisSnapshot).where(AnalysisSnapshot.id == job_id, AnalysisSnapshot.note == QUEUED)
+                    .values(note=RUNNING)
+                )
+                await db.commit()
+                if claimed.rowcount != 1:
+                    return  # taken by another process
+                await self._execute(db, job_id)
+            except asyncio.CancelledError:
+                # Shutting down: hand the job to the next process instead of leaving it "running"
+                await db.rollback()
+                await db.execute(update(AnalysisSnapshot).where(AnalysisSnapshot.id == job_id).values(note=QUEUED))
+                await db.commit()
+                raise
+
+    async def _execute(self, db, job_id: str) -> None:
+        row = await db.get(AnalysisSnapshot, job_id)
+
+        async def mark_started():  # once a pool worker is free, so JOB_TIMEOUT covers run time only
+            row.payload = {**row.payload, "started_at": _now()}
+            await db.commit()
+        try:
+            result = await run_pooled(row.payload["job_kind"], row.payload["input"], settings.JOB_TIMEOUT,
+                                         on_start=mark_started)
+            status, outcome = SUCCEEDED, {"result": result}
+        except asyncio.TimeoutError:
+            status, outcome = FAILED, {"error": f"timed out after {settings.JOB_TIMEOUT}s"}
+        except Exception as e:
+            status, outcome = FAILED, {"error": f"{type(e).__name__}: {e}"}
+        row.note = status
+        row.payload = {**row.payload, **outcome, "finished_at": _now()}
+        await db.commit()
+
+    async def get(self, job_id: str) -> Optional[AnalysisSnapshot]:
+        async with async_session() as db:
+            row = await db.get(AnalysisSnapshot, job_id)
+        return row if row is not None and row.kind == JOB_KIND else None
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[AnalysisSnapshot]:
+        """Long-poll: the job row once finished, or as it stands after `timeout` seconds."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(0.0, timeout)
+        while True:
+            row = await self.get(job_id)
+            remaining = deadline - loop.time()
+            if row is None or row.note in FINISHED or remaining <= 0:
+                return row
+            event = self._done.get(job_id)
+            try:
+                await asyncio.wait_for(event.wait() if event else asyncio.sleep(POLL_INTERVAL),
+                                       min(remaining, POLL_INTERVAL))
+            except asyncio.TimeoutError:
+                pass
+
+
+job_queue = JobQueue()
+on_primary_ready(job_queue._on_primary)
@@ -1,34 +1,69 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from typing import List, Dict, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, insert, func, case, literal, cast, type_coerce, Float, LargeBinary
+import json
 import os
 import uuid
 
 from .config import settings
-from .schemas import ProductIn, BCGPoint, SWOTIn, SWOTOut, SnapshotIn, SnapshotOut, CompanyIn, CompanyOut, MarketIn, MarketOut, ProductCreate, ProductOut, SuggestSWOTIn, MarketsBulkIn, ProductsBulkIn, MarketsBulkOut, ProductsBulkOut
-from .services.bcg import classify_bcg
-from .services.swot import build_swot
-from .services.porter import forces_index
+from .schemas import ProductIn, BCGPoint, BCGColumnsIn, BCGColumnsOut, SWOTIn, SWOTOut, SWOTMergeIn, SWOTMergeOut, SWOTSearchHit, SWOTCategory, SnapshotIn, SnapshotOut, SnapshotSummaryOut, SnapshotDiffOut, TrendPointOut, CompanyIn, CompanyOut, MarketIn, MarketOut, ProductCreate, ProductOut, SuggestSWOTIn, MarketsBulkIn, ProductsBulkIn, MarketsBulkOut, ProductsBulkOut, BulkIngestOut, CompaniesBulkIn, UpsertOut, CompanySummaryOut, MarketSummaryOut, BatchIn, JobIn, JobOut, SimulateIn, SimulateOut, PorterWeightsIn, PorterWeightsOut, PorterBatchIn, PorterBatchOut, PorterForcesIn
+from .services.bcg import classify_bcg, classify_bcg_columns
+from .services.swot import SWOTIndex, build_swot, merge_swots, merged_indexes
+from .services.porter import forces_index, score_columns
 from .services.ai_suggest import suggest_swot
-from .db import Base, engine, get_db, is_database_available
-from .models import AnalysisSnapshot, Company, Market, Product
+from .services.simulate import simulate
+from .services.snapshot_diff import diff_payloads, point_rows
+from .batch import forget_executor, run_batch, shutdown_executor
+from .jobs import JOB_KIND, PrimaryNotReady, QueueFull, job_queue, job_view
+from .cache import cached_response, canonical_key, result_cache
+from .materialize import refresh_markets, refresh_products
+from .metrics import InstrumentationMiddleware, InstrumentedRoute, PROFILE_ID_HEADER, profiles, registry
+from .pagination import NEXT_CURSOR_HEADER, keyset, split_page
+from .ingest import detect_format, ingest_stream, prepare_row
+from .upsert import upsert_rows
+from . import idempotency
+from .replica import StickyWritesMiddleware, get_read_db, read_session, replica
+from .export import MEDIA_TYPES, Col, check_format, select_columns, stream_rows
+from .db import dispose_inherited_pools, get_async_db, is_database_available, database_status, start_readiness_probe
+from .fastjson import JSONBytesResponse, dumps, encode_rows, encode_rows_raw
+from .models import decompress_payload, dump_payload, AnalysisSnapshot, SnapshotPoint, BCGEntry, Company, Market, Product, PorterWeightProfile
 
 app = FastAPI(title=settings.APP_NAME, version="0.1.0")
+# Must be set before any route is declared: splits each request into validation/handler/serialization
+app.router.route_class = InstrumentedRoute
 
-# Create tables on startup
+# No connection tests at import: schema creation is `python -m app.migrate` (run once per deploy),
+# and PostgreSQL readiness is probed in the background while SQLite serves
 @app.on_event("startup")
-def on_startup():
-    if engine is not None:
-        try:
-            Base.metadata.create_all(bind=engine)
-            print("Database tables created successfully")
-        except Exception as e:
-            print(f"Warning: Could not create database tables: {e}")
-            print("Database endpoints will not work until connection is established")
-    else:
-        print("Database not configured - skipping table creation")
+async def on_startup():
+    app.state.db_probe = await start_readiness_probe()
+    app.state.replica_monitor = await replica.start()
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    probe = getattr(app.state, "db_probe", None)
+    if probe is not None and not probe.done():
+        probe.cancel()
+    monitor = getattr(app.state, "replica_monitor", None)
+    if monitor is not None:
+        monitor.cancel()
+    await job_queue.stop(drain=settings.SHUTDOWN_DRAIN_SECONDS)
+    await replica.dispose()
+    shutdown_executor()
+
+def after_fork():
+    """gunicorn post_fork hook when the app is preloaded in the master (gunicorn.conf.py): nothing
+    holding a socket, file handle or pool may be shared between workers."""
+    dispose_inherited_pools()
+    result_cache.reopen_backend()
+    forget_executor()
 
 # Get CORS origins as a list
 cors_origins = settings.get_cors_origins()
@@ -52,159 +87,675 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", PROFILE_ID_HEADER, idempotency.REPLAYED_HEADER],
 )
+if replica.configured:
+    app.add_middleware(StickyWritesMiddleware)
+app.add_middleware(InstrumentationMiddleware, profiling_enabled=settings.PROFILING_ENABLED)
+
+# List endpoints use keyset pagination: pass the X-Next-Cursor response header back as ?cursor=
+PAGE_DEFAULT = 200
+PAGE_MAX = 1000
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
 @app.post("/bcg", response_model=List[BCGPoint])
-async def bcg(products: List[ProductIn]):
-    return classify_bcg(products)
+async def bcg(products: List[ProductIn], request: Request):
+    return cached_response(request, "bcg", products, lambda: classify_bcg(products))
+
+@app.post("/bcg/columnar", response_model=BCGColumnsOut)
+async def bcg_columnar(body: BCGColumnsIn, request: Request):
+    return cached_response(request, "bcg-columnar", body, lambda: classify_bcg_columns(
+        body.name, body.market_share, body.largest_rival_share, body.market_growth_rate,
+        growth_threshold=body.growth_threshold, rms_threshold=body.rms_threshold,
+    ), render=dumps)
 
 @app.post("/swot", response_model=SWOTOut)
-async def swot(swot: SWOTIn):
-    return build_swot(swot)
+async def swot(swot: SWOTIn, request: Request):
+    return cached_response(request, "swot", swot, lambda: build_swot(swot))
+
+# Merge many units' SWOTs: items deduped by canonical form and ranked by how many units mention them.
+# The merged index is kept per process (LRU) and, with caching on, in the result cache under its
+# content hash, so searches reach it from any worker when CACHE_BACKEND_URL is shared.
+def _index_key(merge_id: str) -> str:
+    return f"swot-index:{merge_id}"
+
+def _merge_index(merge_id: str) -> Optional[SWOTIndex]:
+    index = merged_indexes.get(merge_id)
+    if index is None and settings.CACHE_ENABLED:
+        state = result_cache.get(_index_key(merge_id))
+        if state is not None:
+            index = SWOTIndex.from_state(json.loads(state))
+            merged_indexes.put(merge_id, index)
+    return index
+
+@app.post("/swot/merge", response_model=SWOTMergeOut)
+async def swot_merge(body: SWOTMergeIn):
+    merge_id = canonical_key("swot-merge", body.units)
+    index = _merge_index(merge_id)
+    if index is None:
+        index = await run_in_threadpool(merge_swots, body.units)
+        merged_indexes.put(merge_id, index)
+        if settings.CACHE_ENABLED:
+            result_cache.set(_index_key(merge_id), dumps(index.state()))
+    out = {"merge_id": merge_id, "units": index.units, **index.merged(body.top)}
+    if body.q is not None:
+        out["hits"] = index.search(body.q, body.category, body.limit)
+    return JSONBytesResponse(dumps(out))
+
+@app.get("/swot/merge/{merge_id}/search", response_model=list[SWOTSearchHit])
+async def swot_merge_search(merge_id: str, q: str, category: Optional[SWOTCategory] = None, limit: int = 50):
+    """Merged items containing every word of `q` (e.g. q=pricing&category=threats), most frequent first."""
+    index = _merge_index(merge_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Merge not found (expired, or not shared with this worker); "
+                                                    "POST /swot/merge again, with `q` to search in the same request")
+    return JSONBytesResponse(dumps(index.search(q, category, _page_limit(limit))))
+
+async def _profile_weights(db: AsyncSession, name: str) -> Dict[str, float]:
+    row = (await db.scalars(select(PorterWeightProfile).where(PorterWeightProfile.name == name))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Porter weight profile '{name}' not found")
+    return row.weights
 
 @app.post("/porter")
-async def porter(inputs: Dict[str, float]):
-    return forces_index(inputs)
+async def porter(inputs: PorterForcesIn, request: Request, profile: str | None = None, db: AsyncSession = Depends(get_async_db)):
+    if profile is None:
+        return cached_response(request, "porter", inputs, lambda: forces_index(inputs))
+    weights = await _profile_weights(db, profile)
+    return cached_response(request, "porter-weighted", {"inputs": inputs, "weights": weights},
+                           lambda: forces_index(inputs, weights))
+
+@app.post("/porter/batch", response_model=PorterBatchOut)
+async def porter_batch(body: PorterBatchIn, request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Whole industry in one call: columnar scores in, overall scores plus per-force ranks/percentiles out
+    weights = await _profile_weights(db, body.profile) if body.profile else body.weights
+    n = len(body.companies)
+
+    def compute():
+        return {"companies": body.companies, **score_columns(body.scores, n, weights)}
+    return cached_response(request, "porter-batch", {"companies": body.companies, "scores": body.scores, "weights": weights},
+                           compute, render=dumps)
+
+# Porter weight profiles (named, optionally per industry); POST replaces a profile with the same name
+def _profile_out(row: PorterWeightProfile) -> PorterWeightsOut:
+    return PorterWeightsOut(id=str(row.id), name=row.name, industry=row.industry, weights=row.weights)
+
+@app.post("/porter/profiles", response_model=PorterWeightsOut)
+async def save_porter_profile(body: PorterWeightsIn, db: AsyncSession = Depends(get_async_db)):
+    row = (await db.scalars(select(PorterWeightProfile).where(PorterWeightProfile.name == body.name))).first()
+    if row is None:
+        row = PorterWeightProfile(name=body.name)
+        db.add(row)
+    row.industry, row.weights = body.industry, body.weights
+    await db.commit()
+    return _profile_out(row)
+
+@app.get("/porter/profiles", response_model=list[PorterWeightsOut])
+async def list_porter_profiles(industry: str | None = None, db: AsyncSession = Depends(get_read_db)):
+    q = select(PorterWeightProfile).order_by(PorterWeightProfile.name)
+    if industry:
+        q = q.where(PorterWeightProfile.industry == industry)
+    return [_profile_out(r) for r in (await db.scalars(q)).all()]
+
+@app.get("/porter/profiles/{name}", response_model=PorterWeightsOut)
+async def get_porter_profile(name: str, db: AsyncSession = Depends(get_read_db)):
+    row = (await db.scalars(select(PorterWeightProfile).where(PorterWeightProfile.name == name))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Porter weight profile '{name}' not found")
+    return _profile_out(row)
 
 @app.post("/snapshots", response_model=SnapshotOut)
-async def create_snapshot(body: SnapshotIn, db: Session = Depends(get_db)):
+async def create_snapshot(body: SnapshotIn, db: AsyncSession = Depends(get_async_db)):
     if not is_database_available():
         raise HTTPException(status_code=503, detail="Database service unavailable")
     
     try:
         row = AnalysisSnapshot(kind=body.kind, payload=body.payload, note=body.note)
         db.add(row)
-        db.commit()
-        db.refresh(row)
+        await db.flush()
+        points = point_rows(row.id, row.kind, row.created_at, row.payload)
+        if points:
+            await db.execute(insert(SnapshotPoint), points)
+        await db.commit()
+        await db.refresh(row)
         return SnapshotOut(id=str(row.id), kind=row.kind, payload=row.payload, note=row.note, created_at=row.created_at)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-@app.get("/snapshots", response_model=list[SnapshotOut])
-async def list_snapshots(kind: Optional[str] = None, limit: int = 50, db: Session = Depends(get_db)):
+# List endpoints select plain columns in response-model field order and encode the tuples directly
+# (fastjson.py); numerics are cast to float in SQL so no per-field Decimal conversion is needed
+def _f(col):
+    return cast(col, Float).label(col.key)
+
+COMPANY_COLS = (Company.name, Company.industry, Company.region, Company.id)
+MARKET_COLS = (Market.company_id, Market.name, _f(Market.growth_rate), _f(Market.size), Market.id)
+PRODUCT_COLS = (Product.company_id, Product.market_id, Product.name, _f(Product.market_share),
+                _f(Product.largest_rival_share), _f(Product.price), _f(Product.revenue), Product.id)
+SNAPSHOT_SUMMARY_COLS = (AnalysisSnapshot.id, AnalysisSnapshot.kind, AnalysisSnapshot.note,
+                         AnalysisSnapshot.created_at, AnalysisSnapshot.payload_size)
+# Background job rows share the snapshot table (app/jobs.py) but are not analysis history
+IS_ANALYSIS = AnalysisSnapshot.kind != JOB_KIND
+
+def _keys(cols) -> list[str]:
+    return [c.key for c in cols]
+
+def _raw_payload_column(keys: list[str], dialect: str):
+    """Payload column for listings: decoded JSONB on Postgres, the compressed blob (not decoded) elsewhere.
+
+    With `keys`, Postgres builds the projected object server-side. `dialect` is the session's (it may be the replica)."""
+    if dialect == "postgresql":
+        payload = AnalysisSnapshot.payload
+        if keys:
+            args = []
+            for k in keys:
+                args += [literal(k), AnalysisSnapshot.payload[k]]
+            payload = type_coerce(func.jsonb_build_object(*args), AnalysisSnapshot.payload.type)
+        return payload.label("payload")
+    return type_coerce(AnalysisSnapshot.payload, LargeBinary).label("payload")
+
+def _raw_payload(value, keys: list[str], dialect: str) -> bytes:
+    """Payload JSON bytes, encoded exactly as /snapshots/{id} encodes it (dump_payload's compact format)."""
+    if dialect == "postgresql":
+        # JSONB::text has its own spacing; re-encode the decoded value instead
+        return dump_payload(value)
+    raw = decompress_payload(value)
+    if keys:
+        # Projection off Postgres has to decode; summary/full listings never do
+        data = json.loads(raw)
+        return dump_payload({k: data.get(k) for k in keys})
+    return raw
+
+@app.get("/snapshots", response_model=list[SnapshotOut] | list[SnapshotSummaryOut])
+async def list_snapshots(kind: Optional[str] = None, limit: int = 50, cursor: Optional[str] = None,
+                         summary: bool = False, fields: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    """`summary=true`: metadata + payload_size only (payload never read).
+    `fields=a,b`: payload restricted to those top-level keys (missing keys come back as null)."""
     if not is_database_available():
         raise HTTPException(status_code=503, detail="Database service unavailable")
     
+    limit = _page_limit(limit, 200)
+    keys = [k.strip() for k in fields.split(",") if k.strip()] if fields else []
+    if summary:
+        q = select(*SNAPSHOT_SUMMARY_COLS)
+    else:
+        q = select(AnalysisSnapshot.kind, _raw_payload_column(keys, db.bind.dialect.name), AnalysisSnapshot.note,
+                   AnalysisSnapshot.id, AnalysisSnapshot.created_at)
+    q = q.where(IS_ANALYSIS)
+    if kind:
+        q = q.where(AnalysisSnapshot.kind == kind)
+    q = _keyset(q, (AnalysisSnapshot.created_at, AnalysisSnapshot.id), (datetime.fromisoformat, str), cursor, limit, desc=True)
     try:
-        q = db.query(AnalysisSnapshot).order_by(AnalysisSnapshot.created_at.desc())
-        if kind:
-            q = q.filter(AnalysisSnapshot.kind == kind)
-        rows = q.limit(min(limit, 200)).all()
-        return [SnapshotOut(id=str(r.id), kind=r.kind, payload=r.payload, note=r.note, created_at=r.created_at) for r in rows]
+        rows = (await db.execute(q)).all()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    rows, headers = _page(rows, limit, lambda r: (r.created_at, r.id))
+    if summary:
+        return JSONBytesResponse(encode_rows(rows, _keys(SNAPSHOT_SUMMARY_COLS)), headers=headers)
+    rows = [(r.kind, _raw_payload(r.payload, keys, db.bind.dialect.name), r.note, r.id, r.created_at) for r in rows]
+    return JSONBytesResponse(encode_rows_raw(rows, ["kind", "payload", "note", "id", "created_at"], "payload"), headers=headers)
+
+@app.get("/snapshots/diff", response_model=SnapshotDiffOut)
+async def diff_snapshots(a: str, b: str, db: AsyncSession = Depends(get_read_db)):
+    """Structural diff going from snapshot `a` to snapshot `b` (see services/snapshot_diff.py)."""
+    if not is_database_available():
+        raise HTTPException(status_code=503, detail="Database service unavailable")
+    try:
+        rows = {r.id: r for r in (await db.execute(
+            select(AnalysisSnapshot.id, AnalysisSnapshot.kind, AnalysisSnapshot.payload).where(AnalysisSnapshot.id.in_([a, b]), IS_ANALYSIS)
+        )).all()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    missing = [sid for sid in (a, b) if sid not in rows]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Snapshot not found: {', '.join(missing)}")
+    ra, rb = rows[a], rows[b]
+    return SnapshotDiffOut(a=a, b=b, kind_a=ra.kind, kind_b=rb.kind, **diff_payloads(ra.payload, rb.payload))
+
+TREND_COLS = (SnapshotPoint.snapshot_id, SnapshotPoint.created_at, SnapshotPoint.metric, SnapshotPoint.value, SnapshotPoint.label)
+
+@app.get("/snapshots/trend", response_model=list[TrendPointOut])
+async def snapshot_trend(kind: str, product: str = "", metric: Optional[str] = None,
+                         since: Optional[datetime] = None, until: Optional[datetime] = None,
+                         limit: int = PAGE_DEFAULT, cursor: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    """One subject's values over time, oldest first, from snapshot_points (never reads payloads).
+
+    `product` is the item name (empty for top-level values such as Porter forces); without
+    `metric` every metric of the subject is returned."""
+    if not is_database_available():
+        raise HTTPException(status_code=503, detail="Database service unavailable")
+    limit = _page_limit(limit)
+    q = select(*TREND_COLS).where(SnapshotPoint.kind == kind, SnapshotPoint.subject == product)
+    if metric:
+        q = q.where(SnapshotPoint.metric == metric)
+    if since:
+        q = q.where(SnapshotPoint.created_at >= since)
+    if until:
+        q = q.where(SnapshotPoint.created_at < until)
+    q = _keyset(q, (SnapshotPoint.created_at, SnapshotPoint.snapshot_id, SnapshotPoint.metric),
+                (datetime.fromisoformat, str, str), cursor, limit)
+    try:
+        rows = (await db.execute(q)).all()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    rows, headers = _page(rows, limit, lambda r: (r.created_at, r.snapshot_id, r.metric))
+    return JSONBytesResponse(encode_rows(rows, _keys(TREND_COLS)), headers=headers)
 
 @app.get("/db-status")
 async def db_status():
     return {
         "database_available": is_database_available(),
         "database_url_configured": bool(os.getenv("DATABASE_URL")),
-        "message": "Database ready" if is_database_available() else "Database not available - check configuration"
+        "message": "Database ready" if is_database_available() else "Database not available - check configuration",
+        **database_status(),
+        **replica.status(),
     }
 
+def _as_uuid(value: str, field: str) -> uuid.UUID:
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{field} is not a valid UUID")
+
+def _page_limit(limit: int, maximum: int = PAGE_MAX) -> int:
+    return max(1, min(limit, maximum))
+
+def _keyset(q, cols, types, cursor: str | None, limit: int, desc: bool = False):
+    try:
+        return keyset(q, cols, types, cursor, limit, desc=desc)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _page(rows, limit: int, key):
+    """(page, headers) for endpoints that build their own response."""
+    page, nxt = split_page(rows, limit, key)
+    return page, ({NEXT_CURSOR_HEADER: nxt} if nxt else {})
+
+def _set_next_cursor(response: Response, rows, limit: int, key):
+    page, nxt = split_page(rows, limit, key)
+    if nxt:
+        response.headers[NEXT_CURSOR_HEADER] = nxt
+    return page
+
+async def _commit_unique(db: AsyncSession, write=None) -> None:
+    """Run `write` (optional) and commit; natural-key collisions become 409 (use the /upsert endpoints)."""
+    try:
+        if write is not None:
+            await db.flush()
+            await write()
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"Duplicate or invalid reference: {e.orig}")
+
+# Idempotent upserts on natural keys: name for companies, (company_id, name) for markets and products.
+# Each sent row fully replaces the stored one; the counts come from RETURNING (see upsert.py).
+async def _upsert(request: Request, endpoint: str, body, model, db: AsyncSession, refresh=None) -> Response:
+    if not is_database_available():
+        raise HTTPException(status_code=503, detail="Database service unavailable")
+    key = request.headers.get(idempotency.IDEMPOTENCY_HEADER)
+    digest = idempotency.request_hash(body)
+    try:
+        if key:
+            stored = await idempotency.lookup(db, key, endpoint, digest)
+            if stored is not None:
+                return JSONBytesResponse(stored.response, status_code=stored.status_code,
+                                         headers={idempotency.REPLAYED_HEADER: "true"})
+        inserted, updated, unchanged = await upsert_rows(db, model, [prepare_row(i.model_dump()) for i in body.items])
+        if refresh is not None and (inserted or updated):
+            await refresh(db, inserted + updated)
+        content = dumps(UpsertOut(inserted=len(inserted), updated=len(updated), unchanged=unchanged).model_dump())
+        if key:
+            await idempotency.record(db, key, endpoint, digest, 200, content)
+        await db.commit()
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+    except IntegrityError as e:
+        await db.rollback()
+        if key:  # a concurrent request with the same key committed first: replay its response
+            stored = await idempotency.lookup(db, key, endpoint, digest)
+            if stored is not None:
+                return JSONBytesResponse(stored.response, status_code=stored.status_code,
+                                         headers={idempotency.REPLAYED_HEADER: "true"})
+        raise HTTPException(status_code=409, detail=f"Invalid reference: {e.orig}")
+    return JSONBytesResponse(content)
+
+@app.post("/companies/upsert", response_model=UpsertOut)
+async def companies_upsert(body: CompaniesBulkIn, request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _upsert(request, "companies/upsert", body, Company, db)
+
+@app.post("/markets/upsert", response_model=UpsertOut)
+async def markets_upsert(body: MarketsBulkIn, request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _upsert(request, "markets/upsert", body, Market, db, refresh_markets)
+
+@app.post("/products/upsert", response_model=UpsertOut)
+async def products_upsert(body: ProductsBulkIn, request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _upsert(request, "products/upsert", body, Product, db, refresh_products)
+
 # Companies
 @app.post("/companies", response_model=CompanyOut)
-async def create_company(body: CompanyIn, db: Session = Depends(get_db)):
+async def create_company(body: CompanyIn, db: AsyncSession = Depends(get_async_db)):
     row = Company(name=body.name, industry=body.industry, region=body.region)
-    db.add(row); db.commit(); db.refresh(row)
+    db.add(row)
+    await _commit_unique(db)
     return CompanyOut(id=str(row.id), **body.model_dump())
 
 @app.get("/companies", response_model=list[CompanyOut])
-async def list_companies(db: Session = Depends(get_db)):
-    rows = db.query(Company).order_by(Company.name.asc()).all()
-    return [CompanyOut(id=str(r.id), name=r.name, industry=r.industry, region=r.region) for r in rows]
+async def list_companies(limit: int = PAGE_DEFAULT, cursor: str | None = None, db: AsyncSession = Depends(get_read_db)):
+    limit = _page_limit(limit)
+    q = _keyset(select(*COMPANY_COLS), (Company.name, Company.id), (str, uuid.UUID), cursor, limit)
+    rows, headers = _page((await db.execute(q)).all(), limit, lambda r: (r.name, r.id))
+    return JSONBytesResponse(encode_rows(rows, _keys(COMPANY_COLS)), headers=headers)
 
 # Markets
 @app.post("/markets", response_model=MarketOut)
-async def create_market(body: MarketIn, db: Session = Depends(get_db)):
-    row = Market(company_id=body.company_id, name=body.name, growth_rate=body.growth_rate, size=body.size)
-    db.add(row); db.commit(); db.refresh(row)
+async def create_market(body: MarketIn, db: AsyncSession = Depends(get_async_db)):
+    try:
+        row = Market(**prepare_row(body.model_dump()))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    db.add(row)
+    await _commit_unique(db, lambda: refresh_markets(db, [row.id]))
     return MarketOut(id=str(row.id), **body.model_dump())
 
 @app.get("/markets", response_model=list[MarketOut])
-async def list_markets(company_id: str | None = None, db: Session = Depends(get_db)):
-    q = db.query(Market)
+async def list_markets(company_id: str | None = None, limit: int = PAGE_DEFAULT, cursor: str | None = None, db: AsyncSession = Depends(get_read_db)):
+    limit = _page_limit(limit)
+    q = select(*MARKET_COLS)
     if company_id:
-        q = q.filter(Market.company_id == company_id)
-    rows = q.order_by(Market.name.asc()).all()
-    return [MarketOut(id=str(r.id), company_id=str(r.company_id) if r.company_id else None, name=r.name, growth_rate=float(r.growth_rate), size=float(r.size) if r.size is not None else None) for r in rows]
+        q = q.where(Market.company_id == _as_uuid(company_id, "company_id"))
+    q = _keyset(q, (Market.name, Market.id), (str, uuid.UUID), cursor, limit)
+    rows, headers = _page((await db.execute(q)).all(), limit, lambda r: (r.name, r.id))
+    return JSONBytesResponse(encode_rows(rows, _keys(MARKET_COLS)), headers=headers)
 
 # Products
 @app.post("/products", response_model=ProductOut)
-async def create_product(body: ProductCreate, db: Session = Depends(get_db)):
-    row = Product(**body.model_dump())
-    db.add(row); db.commit(); db.refresh(row)
+async def create_product(body: ProductCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        row = Product(**prepare_row(body.model_dump()))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    db.add(row)
+    await _commit_unique(db, lambda: refresh_products(db, [row.id]))
     return ProductOut(id=str(row.id), **body.model_dump())
 
 @app.get("/products", response_model=list[ProductOut])
-async def list_products(company_id: str | None = None, market_id: str | None = None, db: Session = Depends(get_db)):
-    q = db.query(Product)
+async def list_products(company_id: str | None = None, market_id: str | None = None, limit: int = PAGE_DEFAULT, cursor: str | None = None, db: AsyncSession = Depends(get_read_db)):
+    limit = _page_limit(limit)
+    q = select(*PRODUCT_COLS)
     if company_id:
-        q = q.filter(Product.company_id == company_id)
+        q = q.where(Product.company_id == _as_uuid(company_id, "company_id"))
     if market_id:
-        q = q.filter(Product.market_id == market_id)
-    rows = q.order_by(Product.name.asc()).all()
-    out: list[ProductOut] = []
-    for r in rows:
-        out.append(ProductOut(
-            id=str(r.id),
-            company_id=str(r.company_id) if r.company_id else None,
-            market_id=str(r.market_id) if r.market_id else None,
-            name=r.name,
-            market_share=float(r.market_share) if r.market_share is not None else None,
-            largest_rival_share=float(r.largest_rival_share) if r.largest_rival_share is not None else None,
-            price=float(r.price) if r.price is not None else None,
-            revenue=float(r.revenue) if r.revenue is not None else None,
-        ))
-    return out
+        q = q.where(Product.market_id == _as_uuid(market_id, "market_id"))
+    q = _keyset(q, (Product.name, Product.id), (str, uuid.UUID), cursor, limit)
+    rows, headers = _page((await db.execute(q)).all(), limit, lambda r: (r.name, r.id))
+    return JSONBytesResponse(encode_rows(rows, _keys(PRODUCT_COLS)), headers=headers)
+
+# Materialized BCG matrix: maintained by the product/market create and bulk endpoints
+@app.get("/companies/{company_id}/bcg", response_model=list[BCGPoint])
+async def company_bcg(company_id: str, response: Response, limit: int = PAGE_MAX, cursor: str | None = None, db: AsyncSession = Depends(get_read_db)):
+    limit = _page_limit(limit, 10000)
+    cid = _as_uuid(company_id, "company_id")
+    if await db.get(Company, cid) is None:
+        raise HTTPException(status_code=404, detail="Company not found")
+    q = select(BCGEntry).where(BCGEntry.company_id == cid)
+    q = _keyset(q, (BCGEntry.name, BCGEntry.product_id), (str, uuid.UUID), cursor, limit)
+    rows = _set_next_cursor(response, (await db.scalars(q)).all(), limit, lambda r: (r.name, r.product_id))
+    return [BCGPoint(name=r.name, rms=r.rms, growth=r.growth, quadrant=r.quadrant) for r in rows]
+
+# Rollups: raw sums per group in SQL (index-only with the rollup indexes, see app/migrate.py), so
+# per-market rows add up exactly to the company totals without a second scan
+_share, _revenue = cast(Product.market_share, Float), cast(Product.revenue, Float)
+ROLLUP_SUMS = (
+    func.count().label("n"),
+    func.count(_share).label("share_n"),
+    func.sum(_share).label("share_sum"),
+    func.sum(_share * _share).label("share_sq"),
+    func.sum(_revenue).label("revenue"),
+    func.sum(_revenue * _share).label("weighted"),
+    func.sum(case((_share.is_not(None), _revenue))).label("weighted_revenue"),
+)
+
+def _rollup(rows) -> dict:
+    def total(k):
+        vals = [r[k] for r in rows if r[k] is not None]
+        return sum(vals) if vals else None
+    share_n, weighted_revenue = total("share_n"), total("weighted_revenue")
+    return {"products": total("n") or 0, "revenue": total("revenue"),
+            "avg_market_share": total("share_sum") / share_n if share_n else None,
+            "revenue_weighted_share": total("weighted") / weighted_revenue if weighted_revenue else None}
+
+def _market_rollup(row) -> dict:
+    return {**_rollup([row]), "hhi": 10000 * row["share_sq"] if row["share_n"] else None}
+
+@app.get("/companies/{company_id}/summary", response_model=CompanySummaryOut)
+async def company_summary(company_id: str, db: AsyncSession = Depends(get_read_db)):
+    cid = _as_uuid(company_id, "company_id")
+    company = await db.get(Company, cid)
+    if company is None:
+        raise HTTPException(status_code=404, detail="Company not found")
+    per_market = (select(Product.market_id, *ROLLUP_SUMS).where(Product.company_id == cid)
+                  .group_by(Product.market_id).subquery())
+    rows = [r._mapping for r in (await db.execute(
+        select(per_market, Market.name.label("market_name")).outerjoin(Market, Market.id == per_market.c.market_id)
+    )).all()]
+    markets = [{"market_id": str(r["market_id"]) if r["market_id"] else None, "market_name": r["market_name"],
+                **_market_rollup(r)} for r in rows]
+    markets.sort(key=lambda m: (-(m["revenue"] or 0), m["market_name"] or ""))
+    return CompanySummaryOut(company_id=str(cid), company_name=company.name, markets=markets, **_rollup(rows))
+
+@app.get("/markets/{market_id}/summary", response_model=MarketSummaryOut)
+async def market_summary(market_id: str, db: AsyncSession = Depends(get_read_db)):
+    mid = _as_uuid(market_id, "market_id")
+    market = await db.get(Market, mid)
+    if market is None:
+        raise HTTPException(status_code=404, detail="Market not found")
+    row = (await db.execute(select(*ROLLUP_SUMS).where(Product.market_id == mid))).one()._mapping
+    return MarketSummaryOut(market_id=str(mid), market_name=market.name,
+                            company_id=str(market.company_id) if market.company_id else None, **_market_rollup(row))
 
 # Bulk endpoints
 @app.post("/markets/bulk", response_model=MarketsBulkOut)
-async def markets_bulk(body: MarketsBulkIn, db: Session = Depends(get_db)):
+async def markets_bulk(body: MarketsBulkIn, db: AsyncSession = Depends(get_async_db)):
     if not is_database_available():
         raise HTTPException(status_code=503, detail="Database service unavailable")
     
-    out = []
-    for m in body.items:
-        row = Market(company_id=m.company_id, name=m.name, growth_rate=m.growth_rate, size=m.size)
-        db.add(row); db.flush(); db.refresh(row)
-        out.append(MarketOut(id=str(row.id), **m.model_dump()))
-    db.commit()
-    return MarketsBulkOut(items=out)
+    try:
+        rows = [prepare_row(m.model_dump()) for m in body.items]
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    async def write():
+        if rows:
+            await db.execute(insert(Market), rows)
+            await refresh_markets(db, [r["id"] for r in rows])
+    await _commit_unique(db, write)
+    return MarketsBulkOut(items=[MarketOut(id=str(r["id"]), **m.model_dump()) for r, m in zip(rows, body.items)])
 
 @app.post("/products/bulk", response_model=ProductsBulkOut)
-async def products_bulk(body: ProductsBulkIn, db: Session = Depends(get_db)):
+async def products_bulk(body: ProductsBulkIn, db: AsyncSession = Depends(get_async_db)):
     if not is_database_available():
         raise HTTPException(status_code=503, detail="Database service unavailable")
     
-    out = []
-    for p in body.items:
-        row = Product(**p.model_dump())
-        db.add(row); db.flush(); db.refresh(row)
-        out.append(ProductOut(id=str(row.id), **p.model_dump()))
-    db.commit()
-    return ProductsBulkOut(items=out)
+    try:
+        rows = [prepare_row(p.model_dump()) for p in body.items]
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    async def write():
+        if rows:
+            await db.execute(insert(Product), rows)
+            await refresh_products(db, [r["id"] for r in rows])
+    await _commit_unique(db, write)
+    return ProductsBulkOut(items=[ProductOut(id=str(r["id"]), **p.model_dump()) for r, p in zip(rows, body.items)])
+
+# Streaming bulk ingest: NDJSON (default) or CSV with a header row, e.g.
+#   curl -X POST --data-binary @products.csv -H "Content-Type: text/csv" /products/bulk/stream
+async def _ingest(request: Request, fmt: str | None, schema, model, db: AsyncSession, refresh) -> BulkIngestOut:
+    if not is_database_available():
+        raise HTTPException(status_code=503, detail="Database service unavailable")
+    try:
+        fmt = detect_format(request.headers.get("content-type"), fmt)
+        n = await ingest_stream(db, request.stream(), fmt, schema, model,
+                                after_batch=lambda ids: refresh(db, ids))
+        await db.commit()
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"Duplicate or invalid reference: {e.orig}")
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return BulkIngestOut(inserted=n)
+
+@app.post("/markets/bulk/stream", response_model=BulkIngestOut)
+async def markets_bulk_stream(request: Request, format: str | None = None, db: AsyncSession = Depends(get_async_db)):
+    return await _ingest(request, format, MarketIn, Market, db, refresh_markets)
+
+@app.post("/products/bulk/stream", response_model=BulkIngestOut)
+async def products_bulk_stream(request: Request, format: str | None = None, db: AsyncSession = Depends(get_async_db)):
+    return await _ingest(request, format, ProductCreate, Product, db, refresh_products)
+
+# Exports: whole result sets streamed from a server-side cursor, same filters and order as the list endpoints
+#   curl -o products.parquet "/export/products?format=parquet&company_id=...&columns=name,revenue"
+EXPORT_PRODUCTS = {
+    "id": Col(Product.id, "str", str), "company_id": Col(Product.company_id, "str", str),
+    "market_id": Col(Product.market_id, "str", str), "name": Col(Product.name, "str"),
+    "market_share": Col(_f(Product.market_share), "float"), "largest_rival_share": Col(_f(Product.largest_rival_share), "float"),
+    "price": Col(_f(Product.price), "float"), "revenue": Col(_f(Product.revenue), "float"),
+}
+EXPORT_MARKETS = {
+    "id": Col(Market.id, "str", str), "company_id": Col(Market.company_id, "str", str), "name": Col(Market.name, "str"),
+    "growth_rate": Col(_f(Market.growth_rate), "float"), "size": Col(_f(Market.size), "float"),
+}
+
+def _export_snapshot_cols(dialect: str) -> dict:
+    payload = Col(_raw_payload_column([], dialect), "str", lambda v: _raw_payload(v, [], dialect).decode("utf-8"))
+    return {"id": Col(AnalysisSnapshot.id, "str"), "kind": Col(AnalysisSnapshot.kind, "str"),
+            "note": Col(AnalysisSnapshot.note, "str"), "created_at": Col(AnalysisSnapshot.created_at, "time"),
+            "payload_size": Col(AnalysisSnapshot.payload_size, "int"), "payload": payload}
+
+async def _export(request: Request, name: str, fmt: str, columns: Optional[str], available, build_query) -> StreamingResponse:
+    if not is_database_available():
+        raise HTTPException(status_code=503, detail="Database service unavailable")
+    try:
+        fmt = check_format(fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    db = await read_session(request)  # closed by stream_rows once the body is sent
+    try:
+        cols = select_columns(available(db.bind.dialect.name) if callable(available) else available, columns)
+        q = build_query(select(*(c.expr for c in cols.values())))
+    except ValueError as e:
+        await db.close()
+        raise HTTPException(status_code=422, detail=str(e))
+    except BaseException:
+        await db.close()
+        raise
+    return StreamingResponse(stream_rows(db, q, cols, fmt, settings.EXPORT_BATCH_ROWS), media_type=MEDIA_TYPES[fmt],
+                             headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'})
+
+@app.get("/export/products")
+async def export_products(request: Request, format: str = "csv", columns: str | None = None,
+                          company_id: str | None = None, market_id: str | None = None):
+    def build(q):
+        if company_id:
+            q = q.where(Product.company_id == _as_uuid(company_id, "company_id"))
+        if market_id:
+            q = q.where(Product.market_id == _as_uuid(market_id, "market_id"))
+        return q.order_by(Product.name, Product.id)
+    return await _export(request, "products", format, columns, EXPORT_PRODUCTS, build)
+
+@app.get("/export/markets")
+async def export_markets(request: Request, format: str = "csv", columns: str | None = None, company_id: str | None = None):
+    def build(q):
+        if company_id:
+            q = q.where(Market.company_id == _as_uuid(company_id, "company_id"))
+        return q.order_by(Market.name, Market.id)
+    return await _export(request, "markets", format, columns, EXPORT_MARKETS, build)
+
+@app.get("/export/snapshots")
+async def export_snapshots(request: Request, format: str = "csv", columns: str | None = None, kind: str | None = None):
+    def build(q):
+        q = q.where(IS_ANALYSIS)
+        if kind:
+            q = q.where(AnalysisSnapshot.kind == kind)
+        return q.order_by(AnalysisSnapshot.created_at.desc(), AnalysisSnapshot.id.desc())
+    return await _export(request, "snapshots", format, columns, _export_snapshot_cols, build)
 
 @app.get("/snapshots/{sid}", response_model=SnapshotOut)
-async def get_snapshot_by_id(sid: str, db: Session = Depends(get_db)):
+async def get_snapshot_by_id(sid: str, db: AsyncSession = Depends(get_read_db)):
     if not is_database_available():
         raise HTTPException(status_code=503, detail="Database service unavailable")
     
     try:
         # For SQLite compatibility, we use string IDs
-        row = db.query(AnalysisSnapshot).filter(AnalysisSnapshot.id == sid).first()
-        if not row:
-            raise HTTPException(status_code=404, detail="Snapshot not found")
-        return SnapshotOut(id=str(row.id), kind=row.kind, payload=row.payload, note=row.note, created_at=row.created_at)
+        row = await db.get(AnalysisSnapshot, sid)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    if not row or row.kind == JOB_KIND:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return SnapshotOut(id=str(row.id), kind=row.kind, payload=row.payload, note=row.note, created_at=row.created_at)
 
 @app.post("/ai/suggest-swot", response_model=SWOTOut)
-async def ai_suggest_swot(body: SuggestSWOTIn) -> SWOTOut:
+async def ai_suggest_swot(body: SuggestSWOTIn, request: Request) -> SWOTOut:
     # For now, always use deterministic heuristic suggester (no external calls)
-    return suggest_swot(body)
+    return cached_response(request, "ai-suggest-swot", body, lambda: suggest_swot(body))
+
+@app.post("/simulate", response_model=SimulateOut)
+async def simulate_portfolio(body: SimulateIn):
+    # CPU-bound (NumPy releases the GIL for most of it): keep it off the event loop
+    try:
+        return await run_in_threadpool(simulate, body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.post("/analyze/batch")
+async def analyze_batch(body: BatchIn):
+    # NDJSON, one line per job as it finishes: {"index", "id", "kind", "ok", "result" | "error", "elapsed_ms"}
+    return StreamingResponse(run_batch(body.jobs, body.timeout), media_type="application/x-ndjson")
+
+# Background jobs: submit returns 202 at once; poll GET /jobs/{id}, or long-poll with ?wait=seconds
+@app.post("/jobs", response_model=JobOut, status_code=202)
+async def submit_job(body: JobIn, response: Response):
+    if not is_database_available():
+        raise HTTPException(status_code=503, detail="Database service unavailable")
+    try:
+        row = await job_queue.submit(body.kind, body.payload)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Job queue full: {e}", headers={"Retry-After": "5"})
+    except PrimaryNotReady as e:
+        raise HTTPException(status_code=503, detail=f"Jobs unavailable: {e}", headers={"Retry-After": "5"})
+    response.headers["Location"] = f"/jobs/{row.id}"
+    return job_view(row)
+
+@app.get("/jobs/{job_id}", response_model=JobOut)
+async def get_job(job_id: str, wait: float = 0):
+    row = await job_queue.wait(job_id, min(wait, settings.JOB_MAX_WAIT))
+    if row is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(row)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus text exposition format
+    cache = {f"result_cache_{k}": v for k, v in result_cache.snapshot().items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+    cache.update({f"jobs_{k}": v for k, v in job_queue.stats().items()})
+    cache.update({f"db_{k}": v for k, v in replica.stats().items()})
+    return PlainTextResponse(registry.render(cache), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    # Collapsed stacks ("frame;frame;frame count"), e.g. for flamegraph.pl or speedscope
+    text = profiles.get(profile_id)
+    if text is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(text)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return result_cache.snapshot()
@@ -0,0 +1,75 @@
+"""Incremental maintenance of the bcg_matrix table.
+
+Each refresh is two set-based statements scoped by a predicate on products: delete the affected
+entries, then re-derive them from a products JOIN markets select. The quadrant logic mirrors
+services.bcg.classify_arrays (rms = share / max(rival, 1e-9), thresholds inclusive).
+"""
+from typing import Iterable, List
+import uuid
+
+from sqlalchemy import Float, and_, case, cast, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import BCGEntry, Market, Product
+from .services.bcg import GROWTH_THRESHOLD, RMS_THRESHOLD
+
+# Chunk IN lists so a single refresh never binds more parameters than SQLite allows
+ID_CHUNK = 500
+
+
+def _derived_select(pred):
+    share = cast(Product.market_share, Float)
+    rival = cast(Product.largest_rival_share, Float)
+    rms = share / case((rival > 1e-9, rival), else_=1e-9)
+    growth = cast(Market.growth_rate, Float)
+    hi_g = growth >= GROWTH_THRESHOLD
+    hi_r = rms >= RMS_THRESHOLD
+    quadrant = case(
+        (and_(hi_g, hi_r), "Star"),
+        (hi_r, "Cash Cow"),
+        (hi_g, "Question Mark"),
+        else_="Dog",
+    )
+    return (
+        select(Product.id, Product.company_id, Product.name, rms, growth, quadrant)
+        .join(Market, Market.id == Product.market_id)
+        .where(pred, Product.company_id.is_not(None),
+               Product.market_share.is_not(None), Product.largest_rival_share.is_not(None))
+    )
+
+
+def refresh_statements(pred) -> list:
+    """(delete, insert) pair that re-derives every matrix entry whose product matches `pred`."""
+    affected = select(Product.id).where(pred)
+    return [
+        delete(BCGEntry).where(BCGEntry.product_id.in_(affected)),
+        insert(BCGEntry).from_select(
+            ["product_id", "company_id", "name", "rms", "growth", "quadrant"], _derived_select(pred)
+        ),
+    ]
+
+
+def _chunks(ids: Iterable[uuid.UUID]) -> Iterable[List[uuid.UUID]]:
+    buf: List[uuid.UUID] = []
+    for i in ids:
+        buf.append(i)
+        if len(buf) >= ID_CHUNK:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+async def _run(db: AsyncSession, pred) -> None:
+    for stmt in refresh_statements(pred):
+        await db.execute(stmt)
+
+
+async def refresh_products(db: AsyncSession, product_ids: Iterable[uuid.UUID]) -> None:
+    for chunk in _chunks(product_ids):
+        await _run(db, Product.id.in_(chunk))
+
+
+async def refresh_markets(db: AsyncSession, market_ids: Iterable[uuid.UUID]) -> None:
+    for chunk in _chunks(market_ids):
+        await _run(db, Product.market_id.in_(chunk))
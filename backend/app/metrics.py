@@ -0,0 +1,282 @@
+"""Per-request timing breakdown, Prometheus exposition and an opt-in sampling profiler.
+
+Each request gets a RequestTimings in a context variable:
+  - db time / query count come from SQLAlchemy cursor events (registered on every Engine, so the
+    lazily built and hot-swapped engines in db.py are covered too);
+  - validation = route entry -> endpoint entry (body parsing, pydantic, dependencies);
+  - handler = time inside the endpoint function; serialization = endpoint exit -> response built.
+"""
+import asyncio
+import contextvars
+import functools
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+
+class RequestTimings:
+    __slots__ = ("route", "db", "queries", "route_start", "endpoint_start", "endpoint_end", "route_end")
+
+    def __init__(self):
+        self.route: Optional[str] = None
+        self.db = 0.0
+        self.queries = 0
+        self.route_start = self.endpoint_start = self.endpoint_end = self.route_end = None
+
+    def span(self, a: Optional[float], b: Optional[float]) -> Optional[float]:
+        return b - a if a is not None and b is not None else None
+
+
+current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.n = 0
+
+    def observe(self, v: float) -> None:
+        i = 0
+        while i < len(BUCKETS) and v > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += v
+        self.n += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hist: Dict[str, Dict[Tuple[str, ...], Histogram]] = defaultdict(dict)
+        self.requests: Counter = Counter()
+        self.queries: Counter = Counter()
+
+    def observe(self, name: str, labels: Tuple[str, ...], v: float) -> None:
+        h = self.hist[name].get(labels)
+        if h is None:
+            h = self.hist[name][labels] = Histogram()
+        h.observe(v)
+
+    def record(self, method: str, route: str, status: int, total: float, t: RequestTimings) -> None:
+        with self._lock:
+            self.requests[(method, route, str(status))] += 1
+            self.queries[(method, route)] += t.queries
+            self.observe("http_request_duration_seconds", (method, route), total)
+            self.observe("http_request_db_seconds", (method, route), t.db)
+            for name, v in (("http_request_validation_seconds", t.span(t.route_start, t.endpoint_start)),
+                            ("http_request_handler_seconds", t.span(t.endpoint_start, t.endpoint_end)),
+                            ("http_request_serialization_seconds", t.span(t.endpoint_end, t.route_end))):
+                if v is not None:
+                    self.observe(name, (method, route), v)
+
+    def render(self, extra: Optional[Dict[str, float]] = None) -> str:
+        out: List[str] = []
+        with self._lock:
+            out += ["# TYPE http_requests_total counter"]
+            for (m, r, s), n in sorted(self.requests.items()):
+                out.append(f'http_requests_total{{method="{m}",route="{r}",status="{s}"}} {n}')
+            out += ["# TYPE http_request_db_queries_total counter"]
+            for (m, r), n in sorted(self.queries.items()):
+                out.append(f'http_request_db_queries_total{{method="{m}",route="{r}"}} {n}')
+            for name, series in sorted(self.hist.items()):
+                out.append(f"# TYPE {name} histogram")
+                for (m, r), h in sorted(series.items()):
+                    lbl = f'method="{m}",route="{r}"'
+                    acc = 0
+                    for le, c in zip(BUCKETS, h.counts):
+                        acc += c
+                        out.append(f'{name}_bucket{{{lbl},le="{le}"}} {acc}')
+                    out.append(f'{name}_bucket{{{lbl},le="+Inf"}} {h.n}')
+                    out.append(f"{name}_sum{{{lbl}}} {h.sum}")
+                    out.append(f"{name}_count{{{lbl}}} {h.n}")
+        for name, v in sorted((extra or {}).items()):
+            out.append(f"# TYPE {name} gauge")
+            out.append(f"{name} {v}")
+        return "\n".join(out) + "\n"
+
+
+registry = Registry()
+
+
+# --- SQLAlchemy hooks ---------------------------------------------------------------------------
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _query_done(conn) -> None:
+    started = conn.info["query_start"].pop()
+    t = current.get()
+    if t is not None:
+        t.db += time.perf_counter() - started
+        t.queries += 1
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _query_done(conn)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(ctx):
+    # A failed statement never reaches after_cursor_execute; pop its start here so the stack stays paired.
+    # No execution context means it failed before before_cursor_execute (connecting, compiling, binding).
+    conn = ctx.connection
+    if conn is not None and ctx.execution_context is not None and conn.info.get("query_start"):
+        _query_done(conn)
+
+
+# --- Route class: validation / handler / serialization split ------------------------------------
+
+def _timed(endpoint: Callable) -> Callable:
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            t = current.get()
+            if t is not None:
+                t.endpoint_start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                if t is not None:
+                    t.endpoint_end = time.perf_counter()
+        return wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        t = current.get()
+        if t is not None:
+            t.endpoint_start = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            if t is not None:
+                t.endpoint_end = time.perf_counter()
+    return sync_wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        path = self.path
+
+        async def instrumented(request):
+            t = current.get()
+            if t is not None:
+                t.route = path
+                t.route_start = time.perf_counter()
+            response = await handler(request)
+            if t is not None:
+                t.route_end = time.perf_counter()
+            return response
+        return instrumented
+
+
+# --- Sampling profiler ----------------------------------------------------------------------------
+
+class Sampler:
+    """Samples one thread's stack on a timer and aggregates collapsed stacks (flamegraph input).
+
+    Requests share the event loop thread, so concurrent requests can show up in each other's profile.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            parts = []
+            while frame is not None:
+                parts.append(f"{frame.f_code.co_name} ({frame.f_code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            if parts:
+                self.stacks[";".join(reversed(parts))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return "\n".join(f"{k} {v}" for k, v in self.stacks.most_common()) + "\n"
+
+
+class ProfileStore:
+    def __init__(self, size: int = 50):
+        self.size = size
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, pid: str, text: str) -> None:
+        with self._lock:
+            self._items[pid] = text
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def get(self, pid: str) -> Optional[str]:
+        with self._lock:
+            return self._items.get(pid)
+
+
+profiles = ProfileStore()
+
+
+# --- ASGI middleware ------------------------------------------------------------------------------
+
+class InstrumentationMiddleware:
+    """Pure ASGI (not BaseHTTPMiddleware) so the context variable reaches the endpoint and streaming works."""
+
+    def __init__(self, app, profiling_enabled: bool = False):
+        self.app = app
+        self.profiling_enabled = profiling_enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t = RequestTimings()
+        token = current.set(t)
+        status = {"code": 500}
+        sampler = None
+        profile_id = ""
+        if self.profiling_enabled and dict(scope["headers"]).get(PROFILE_HEADER.encode()) not in (None, b"", b"0"):
+            profile_id = uuid.uuid4().hex  # sent with the headers, filled in when the request ends
+            sampler = Sampler(threading.get_ident())
+            sampler.start()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if sampler is not None:
+                    message["headers"] = list(message.get("headers", [])) + [(PROFILE_ID_HEADER.encode(), profile_id.encode())]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            total = time.perf_counter() - started
+            current.reset(token)
+            if sampler is not None:
+                profiles.put(profile_id, sampler.stop())
+            registry.record(scope["method"], t.route or "<unmatched>", status["code"], total, t)
@@ -0,0 +1,218 @@
+"""Create/upgrade the schema once per deploy, before any worker starts.
+
+    python -m app.migrate
+    python -m app.migrate --dry-run   # only report which duplicate rows would be merged
+
+Targets DATABASE_URL directly (no SQLite fallback) and exits non-zero if it can't connect.
+"""
+import argparse
+import sys
+
+from sqlalchemy import Index, and_, bindparam, case, create_engine, delete, func, insert, inspect, literal, select, text, true, update
+
+from .config import settings
+from .db import Base, DATABASE_URL, SQLITE_URL
+from . import models  # noqa: F401  (register tables on Base.metadata)
+from .models import dump_payload
+from .materialize import refresh_statements
+from .services.snapshot_diff import point_rows
+
+BACKFILL_CHUNK = 500
+
+
+def upgrade_snapshots(engine) -> None:
+    """Bring analysis_snapshots tables created by earlier versions up to the current layout."""
+    cols = {c["name"]: c for c in inspect(engine).get_columns("analysis_snapshots")}
+    with engine.begin() as conn:
+        if "payload_size" not in cols:
+            conn.execute(text("ALTER TABLE analysis_snapshots ADD COLUMN payload_size INTEGER"))
+        if engine.dialect.name == "postgresql":
+            if cols["payload"]["type"].__class__.__name__ != "JSONB":
+                conn.execute(text("ALTER TABLE analysis_snapshots ALTER COLUMN payload TYPE JSONB USING payload::jsonb"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_snapshots_payload_gin ON analysis_snapshots USING gin (payload)"))
+            conn.execute(text("UPDATE analysis_snapshots SET payload_size = octet_length(payload::text) WHERE payload_size IS NULL"))
+        else:
+            _backfill_payload_sizes(conn)
+
+def _backfill_payload_sizes(conn) -> None:
+    """Off Postgres the payload is a compressed blob, so sizes are computed here (as on insert)."""
+    S = models.AnalysisSnapshot
+    pending = select(S.id, S.payload).where(S.payload_size.is_(None)).order_by(S.id).limit(BACKFILL_CHUNK)
+    last = ""
+    while chunk := conn.execute(pending.where(S.id > last)).all():
+        conn.execute(update(S).where(S.id == bindparam("sid")).values(payload_size=bindparam("size")),
+                     [{"sid": r.id, "size": len(dump_payload(r.payload))} for r in chunk])
+        last = chunk[-1].id
+
+# Which duplicate survives a natural-key merge: the row the most other rows reference (its
+# `children`), then the one with the most filled-in `attrs`, then the lowest id. The survivor keeps
+# its own attributes; the others' references move to it and the others are deleted.
+MERGE_RULES = {
+    "companies": {"keys": ("name",), "attrs": ("industry", "region"),
+                  "children": (("markets", "company_id"), ("products", "company_id"))},
+    "markets": {"keys": ("company_id", "name"), "attrs": ("growth_rate", "size"),
+                "children": (("products", "market_id"),)},
+    "products": {"keys": ("company_id", "name"),
+                 "attrs": ("market_id", "market_share", "largest_rival_share", "price", "revenue"), "children": ()},
+}
+
+def _duplicates(conn, model, rule: dict) -> dict:
+    """{duplicate id: surviving id} for rows sharing a natural key, survivors chosen by MERGE_RULES."""
+    cols = [getattr(model, k) for k in rule["keys"]]
+    tables = Base.metadata.tables
+    children = [select(func.count()).where(tables[t].c[fk] == model.id).scalar_subquery()
+                for t, fk in rule["children"]]
+    filled = [case((getattr(model, a).is_not(None), 1), else_=0) for a in rule["attrs"]]
+    groups = (select(*cols).where(*(c.is_not(None) for c in cols))
+              .group_by(*cols).having(func.count() > 1).subquery())
+    rows = conn.execute(select(model.id, sum(children, literal(0)).label("children"),
+                               sum(filled, literal(0)).label("filled"), *cols)
+                        .join(groups, and_(*(c == groups.c[c.key] for c in cols)))).all()
+    by_key: dict = {}
+    for r in rows:
+        by_key.setdefault(tuple(r[3:]), []).append(r)
+    remap = {}
+    for key, group in by_key.items():
+        group.sort(key=lambda r: (-r.children, -r.filled, str(r.id)))
+        survivor, dropped = group[0], group[1:]
+        print(f"{model.__tablename__}: merging {len(dropped)} duplicate(s) of {dict(zip(rule['keys'], map(str, key)))} "
+              f"into {survivor.id} ({survivor.children} references); removing {', '.join(str(r.id) for r in dropped)}")
+        remap.update({r.id: survivor.id for r in dropped})
+    return remap
+
+def _repoint(conn, model, column: str, remap: dict) -> None:
+    col = getattr(model, column)
+    conn.execute(update(model).where(col == bindparam("old")).values({column: bindparam("new")}),
+                 [{"old": o, "new": n} for o, n in remap.items()])
+
+def upgrade_natural_keys(engine, dry_run: bool = False) -> int:
+    """Merge rows that share a natural key (re-pointing references, see MERGE_RULES), then build the
+    unique indexes the upsert endpoints rely on. Earlier versions inserted duplicates on every sync.
+
+    Every merge is printed. With `dry_run` the merges run in a transaction that is rolled back (so
+    later stages see earlier merges, as for real) and no index is built. Returns rows merged away."""
+    M = models
+    merged = 0
+    with engine.connect() as conn, conn.begin() as trans:
+        remap = _duplicates(conn, M.Company, MERGE_RULES["companies"])
+        if remap:
+            for ref in (M.Market, M.Product, M.BCGEntry):
+                _repoint(conn, ref, "company_id", remap)
+            conn.execute(delete(M.Company).where(M.Company.id == bindparam("old")), [{"old": o} for o in remap])
+            merged += len(remap)
+        remap = _duplicates(conn, M.Market, MERGE_RULES["markets"])
+        if remap:
+            _repoint(conn, M.Product, "market_id", remap)
+            conn.execute(delete(M.Market).where(M.Market.id == bindparam("old")), [{"old": o} for o in remap])
+            merged += len(remap)
+        remap = _duplicates(conn, M.Product, MERGE_RULES["products"])
+        if remap:
+            params = [{"old": o} for o in remap]
+            conn.execute(delete(M.BCGEntry).where(M.BCGEntry.product_id == bindparam("old")), params)
+            conn.execute(delete(M.Product).where(M.Product.id == bindparam("old")), params)
+            merged += len(remap)
+        if dry_run:
+            trans.rollback()
+            return merged
+        if merged:
+            for stmt in refresh_statements(true()):
+                conn.execute(stmt)
+        for table in (M.Company.__table__, M.Market.__table__, M.Product.__table__):
+            for index in table.indexes:
+                if index.unique:
+                    index.create(conn, checkfirst=True)
+    return merged
+
+def backfill_snapshot_points(engine) -> None:
+    """Extract trend points for snapshots stored before snapshot_points existed."""
+    S, P = models.AnalysisSnapshot, models.SnapshotPoint
+    pending = (select(S.id, S.kind, S.created_at, S.payload)
+               .where(~select(P.snapshot_id).where(P.snapshot_id == S.id).exists())
+               .order_by(S.id).limit(BACKFILL_CHUNK))
+    last = ""
+    with engine.begin() as conn:
+        while chunk := conn.execute(pending.where(S.id > last)).all():
+            rows = [p for r in chunk for p in point_rows(r.id, r.kind, r.created_at, r.payload)]
+            if rows:
+                conn.execute(insert(P), rows)
+            last = chunk[-1].id
+
+def rollup_indexes(dialect: str) -> list:
+    """Covering indexes for the /companies|markets/{id}/summary rollups: PostgreSQL INCLUDEs the
+    aggregated columns, SQLite (no INCLUDE) appends them to the key. Built here rather than in the
+    models because they cost every product write; ROLLUP_INDEXES=false drops them."""
+    P = models.Product.__table__
+    covered = ("market_share", "revenue")
+    out = []
+    for name, keys in (("ix_products_company_rollup", ("company_id", "market_id")),
+                       ("ix_products_market_rollup", ("market_id",))):
+        if dialect == "postgresql":
+            out.append(Index(name, *(P.c[k] for k in keys), postgresql_include=list(covered)))
+        else:
+            out.append(Index(name, *(P.c[k] for k in keys + covered)))
+    return out
+
+def upgrade_model_indexes(engine) -> None:
+    """Indexes declared on the models (keyset pagination, trends, ...). create_all skips tables that
+    already exist, so databases created by earlier versions get them here."""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def upgrade_rollup_indexes(engine) -> None:
+    existing = {ix["name"] for ix in inspect(engine).get_indexes("products")}
+    with engine.begin() as conn:
+        for index in rollup_indexes(engine.dialect.name):
+            if settings.ROLLUP_INDEXES and index.name not in existing:
+                index.create(conn)
+            elif not settings.ROLLUP_INDEXES and index.name in existing:
+                index.drop(conn)
+
+def migrate(url: str) -> None:
+    engine = create_engine(url)
+    try:
+        Base.metadata.create_all(bind=engine)
+        upgrade_snapshots(engine)
+        upgrade_natural_keys(engine)
+        upgrade_model_indexes(engine)
+        backfill_snapshot_points(engine)
+        upgrade_rollup_indexes(engine)
+        with engine.begin() as conn:
+            # Backfill the materialized BCG matrix the first time it exists
+            if conn.execute(select(func.count()).select_from(models.BCGEntry)).scalar() == 0:
+                for stmt in refresh_statements(true()):
+                    conn.execute(stmt)
+    finally:
+        engine.dispose()
+
+
+def dry_run(url: str) -> int:
+    engine = create_engine(url)
+    try:
+        if not inspect(engine).has_table("companies"):
+            return 0
+        return upgrade_natural_keys(engine, dry_run=True)
+    finally:
+        engine.dispose()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.migrate")
+    ap.add_argument("--dry-run", action="store_true", help="print the duplicate merges that would run, change nothing")
+    args = ap.parse_args(argv)
+    url = DATABASE_URL or SQLITE_URL
+    try:
+        if args.dry_run:
+            print(f"Dry run: {dry_run(url)} duplicate rows would be merged away")
+            return 0
+        migrate(url)
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        return 1
+    print(f"Database schema up to date ({url.split('://', 1)[0]})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
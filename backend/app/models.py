@@ -1,19 +1,100 @@
+import json
 import uuid
-from sqlalchemy import String, DateTime, Text, Float, Numeric, ForeignKey
+import zlib
+from datetime import datetime, timezone
+from sqlalchemy import String, DateTime, Text, Float, Integer, Numeric, ForeignKey, Index, LargeBinary, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy import JSON
+from sqlalchemy.types import TypeDecorator
 from .db import Base
 
+try:
+    import zstandard
+except ImportError:  # optional: fall back to zlib, which every Python has
+    zstandard = None
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+def dump_payload(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def compress_payload(raw: bytes) -> bytes:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    return zlib.compress(raw, 6)
+
+def decompress_payload(blob) -> bytes:
+    if isinstance(blob, str):  # rows written before compression: plain JSON text
+        return blob.encode("utf-8")
+    blob = bytes(blob)
+    if blob[:4] == ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this snapshot payload")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+class PayloadJSON(TypeDecorator):
+    """JSONB on PostgreSQL; compressed JSON bytes (zstd, else zlib) on SQLite and anything else."""
+    impl = JSON
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return compress_payload(dump_payload(value))
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return json.loads(decompress_payload(value))
+
 class AnalysisSnapshot(Base):
     __tablename__ = "analysis_snapshots"
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     kind: Mapped[str] = mapped_column(String(20), nullable=False)  # 'SWOT','BCG','PESTLE','PORTER','VRIO','ANSOFF'
-    payload: Mapped[dict] = mapped_column(JSON, nullable=False)  # Use JSON instead of JSONB for SQLite compatibility
+    payload: Mapped[dict] = mapped_column(PayloadJSON, nullable=False)
+    payload_size: Mapped[int | None] = mapped_column(Integer, nullable=True)  # bytes of compact JSON; lets list views skip the payload
     note: Mapped[str | None] = mapped_column(String(255), nullable=True)
-    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Python-side default keeps microsecond precision (and one string format on SQLite) for keyset cursors
+    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_snapshots_kind_created", "kind", "created_at", "id"),
+        Index("ix_snapshots_created", "created_at", "id"),
+        Index("ix_snapshots_payload_gin", "payload", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+@event.listens_for(AnalysisSnapshot, "before_insert")
+@event.listens_for(AnalysisSnapshot, "before_update")
+def _set_payload_size(mapper, connection, target):
+    target.payload_size = len(dump_payload(target.payload))
+
+class SnapshotPoint(Base):
+    """One scalar pulled out of a snapshot payload at write time (see services/snapshot_diff.iter_points).
+
+    Payloads are compressed blobs off Postgres, so JSON path extraction can't be indexed there; this
+    table is the portable stand-in for an expression index on (kind, subject, metric, created_at).
+    """
+    __tablename__ = "snapshot_points"
+    snapshot_id: Mapped[str] = mapped_column(String(36), ForeignKey("analysis_snapshots.id", ondelete="CASCADE"), primary_key=True)
+    subject: Mapped[str] = mapped_column(String(160), primary_key=True)  # item name (e.g. product); "" for top-level values
+    metric: Mapped[str] = mapped_column(String(80), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    value: Mapped[float | None] = mapped_column(Float)      # numeric metrics
+    label: Mapped[str | None] = mapped_column(String(160))  # categorical metrics (e.g. quadrant)
+
+    __table_args__ = (
+        Index("ix_snapshot_points_trend", "kind", "subject", "metric", "created_at", "snapshot_id"),
+    )
 
 class Company(Base):
     __tablename__ = "companies"
@@ -22,6 +103,11 @@ class Company(Base):
     industry: Mapped[str | None] = mapped_column(String(120))
     region: Mapped[str | None] = mapped_column(String(120))
 
+    __table_args__ = (
+        Index("ix_companies_name", "name", "id"),
+        Index("ux_companies_name", "name", unique=True),  # natural key for upserts
+    )
+
 class Market(Base):
     __tablename__ = "markets"
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -30,6 +116,12 @@ class Market(Base):
     growth_rate: Mapped[float] = mapped_column(Numeric(6,2), nullable=False)  # percent
     size: Mapped[float | None] = mapped_column(Numeric(18,2))                 # optional
 
+    __table_args__ = (
+        Index("ix_markets_company_name", "company_id", "name", "id"),
+        Index("ix_markets_name", "name", "id"),
+        Index("ux_markets_company_name", "company_id", "name", unique=True),
+    )
+
 class Product(Base):
     __tablename__ = "products"
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -40,3 +132,42 @@ class Product(Base):
     largest_rival_share: Mapped[float | None] = mapped_column(Numeric(6,4))   # 0..1
     price: Mapped[float | None] = mapped_column(Numeric(12,2))
     revenue: Mapped[float | None] = mapped_column(Numeric(18,2))
+
+    __table_args__ = (
+        Index("ix_products_company_name", "company_id", "name", "id"),
+        Index("ix_products_market_name", "market_id", "name", "id"),
+        Index("ix_products_name", "name", "id"),
+        Index("ux_products_company_name", "company_id", "name", unique=True),
+    )
+
+class IdempotencyKey(Base):
+    """Stored response of a write request sent with an Idempotency-Key header, replayed on retry."""
+    __tablename__ = "idempotency_keys"
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    endpoint: Mapped[str] = mapped_column(String(120), nullable=False)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int] = mapped_column(Integer, nullable=False)
+    response: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+
+class BCGEntry(Base):
+    """Materialized BCG classification per product, maintained incrementally (see app/materialize.py)."""
+    __tablename__ = "bcg_matrix"
+    product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("products.id"), primary_key=True)
+    company_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False)
+    name: Mapped[str] = mapped_column(String(160), nullable=False)
+    rms: Mapped[float] = mapped_column(Float, nullable=False)
+    growth: Mapped[float] = mapped_column(Float, nullable=False)
+    quadrant: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    __table_args__ = (
+        Index("ix_bcg_matrix_company_name", "company_id", "name", "product_id"),
+    )
+
+class PorterWeightProfile(Base):
+    """Named Porter five-forces weighting, optionally tied to an industry."""
+    __tablename__ = "porter_weight_profiles"
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    name: Mapped[str] = mapped_column(String(80), nullable=False, unique=True)
+    industry: Mapped[str | None] = mapped_column(String(120), index=True)
+    weights: Mapped[dict] = mapped_column(JSON, nullable=False)
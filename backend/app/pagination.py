@@ -0,0 +1,56 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Sequence, Tuple
+
+from sqlalchemy import Select, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _enc(v: Any) -> Any:
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, uuid.UUID):
+        return str(v)
+    return v
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps([_enc(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, types: Sequence[Callable[[Any], Any]]) -> Tuple[Any, ...]:
+    """Inverse of encode_cursor; raises ValueError on anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return tuple(t(v) for t, v in zip(types, values))
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def keyset(q: Select, cols: Sequence[Any], types: Sequence[Callable[[Any], Any]],
+           cursor: str | None, limit: int, desc: bool = False) -> Select:
+    """Order by `cols` (last one must be unique) and seek past `cursor`.
+
+    Fetches limit + 1 rows so the caller can tell whether another page exists.
+    """
+    if cursor:
+        after = decode_cursor(cursor, types)
+        key = tuple_(*cols)
+        q = q.where(key < tuple_(*after) if desc else key > tuple_(*after))
+    order = [c.desc() if desc else c.asc() for c in cols]
+    return q.order_by(*order).limit(limit + 1)
+
+
+def split_page(rows: Sequence[Any], limit: int, key: Callable[[Any], Tuple[Any, ...]]):
+    """Trim the look-ahead row and return (page, next_cursor or None)."""
+    if len(rows) > limit:
+        page = rows[:limit]
+        return page, encode_cursor(*key(page[-1]))
+    return rows, None
@@ -0,0 +1,204 @@
+"""Optional read replica for the GET endpoints.
+
+When DATABASE_REPLICA_URL is set, read-only routes (lists, snapshot reads, trends, the stored BCG
+matrix) open their session on the replica's own pool. Writes always use the primary. A client's
+reads also stay on the primary for REPLICA_STICKY_SECONDS after its last write (read-your-writes).
+The stickiness marker is a cookie set on responses that committed, so it holds across worker
+processes.
+
+A background check runs every REPLICA_CHECK_INTERVAL seconds. Reads go to the primary while the
+replica is unreachable, lacks the schema, or (on PostgreSQL) replays more than
+REPLICA_MAX_LAG_SECONDS behind. Reads also stay on the primary while the primary is still on its
+SQLite fallback. A replica session that fails to connect falls back to the primary at once and
+marks the replica down until the next check.
+"""
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .db import async_engine_for, async_session, serving_primary
+
+log = logging.getLogger(__name__)
+
+STICKY_COOKIE = "db_primary_until"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+SCHEMA_SQL = text("SELECT 1 FROM companies LIMIT 1")
+# Seconds of replay lag; 0 when caught up (an idle primary leaves the replay timestamp old), NULL off a standby
+LAG_SQL = text("SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+               "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END")
+
+# Per request: a mutable flag the commit hook flips, so the middleware sees it whatever context the handler ran in
+_wrote: ContextVar[Optional[dict]] = ContextVar("db_wrote", default=None)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_write(session) -> None:
+    flag = _wrote.get()
+    if flag is not None:
+        flag["wrote"] = True
+
+
+class Replica:
+    def __init__(self, url: Optional[str]):
+        if url and url.startswith("postgresql://"):
+            url = url.replace("postgresql://", "postgresql+psycopg://", 1)
+        self.url = url
+        self.engine: Optional[AsyncEngine] = None
+        self._sessions: Optional[async_sessionmaker] = None
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.reads = 0  # GET sessions served by the replica
+        self.primary_reads = 0  # GET sessions sent to the primary (sticky, replica down, or not configured)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.url)
+
+    def _ensure(self) -> None:
+        if self.engine is None:
+            self.engine = async_engine_for(make_url(self.url), app_name="bizanalysis-backend-replica")
+            self._sessions = async_sessionmaker(bind=self.engine, autoflush=False, expire_on_commit=False)
+
+    def _set(self, healthy: bool, error: Optional[str] = None) -> None:
+        if healthy != self.healthy:
+            if healthy:
+                log.info("read replica healthy; routing reads to it")
+            else:
+                log.warning("read replica unavailable (%s); reads go to the primary", error)
+        self.healthy, self.last_error = healthy, error
+
+    async def _probe(self) -> Optional[float]:
+        async with self.engine.connect() as conn:
+            await conn.execute(SCHEMA_SQL)
+            if self.engine.dialect.name == "postgresql":
+                return (await conn.execute(LAG_SQL)).scalar()
+        return None
+
+    async def check(self) -> bool:
+        self._ensure()
+        try:
+            lag = await asyncio.wait_for(self._probe(), settings.DB_CONNECT_TIMEOUT)
+        except Exception as e:
+            self.lag = None
+            self._set(False, f"{type(e).__name__}: {e}")
+            return False
+        self.lag = float(lag or 0.0)
+        if self.lag > settings.REPLICA_MAX_LAG_SECONDS:
+            self._set(False, f"{self.lag:.1f}s behind the primary")
+        else:
+            self._set(True)
+        return self.healthy
+
+    async def _monitor(self) -> None:
+        while True:
+            await asyncio.sleep(settings.REPLICA_CHECK_INTERVAL)
+            await self.check()
+
+    async def start(self) -> Optional[asyncio.Task]:
+        """First check before serving, then keep checking in the background."""
+        if not self.configured:
+            return None
+        await self.check()
+        return asyncio.create_task(self._monitor(), name="replica-monitor")
+
+    async def dispose(self) -> None:
+        if self.engine is not None:
+            await self.engine.dispose()
+
+    def routable(self) -> bool:
+        return self.configured and self.healthy and serving_primary()
+
+    async def open(self) -> Optional[AsyncSession]:
+        """A replica session with its connection already checked out, or None (replica marked down)."""
+        session = self._sessions()
+        try:
+            await session.connection()
+        except Exception as e:
+            await session.close()
+            self._set(False, f"{type(e).__name__}: {e}")
+            return None
+        return session
+
+    def stats(self) -> Dict[str, float]:
+        out = {"replica_healthy": int(self.healthy), "replica_reads": self.reads, "primary_reads": self.primary_reads}
+        if self.lag is not None:
+            out["replica_lag_seconds"] = self.lag
+        return out
+
+    def status(self) -> Dict:
+        return {"replica_configured": self.configured, "replica_healthy": self.healthy,
+                "replica_lag_seconds": self.lag, "replica_last_error": self.last_error}
+
+
+replica = Replica(settings.DATABASE_REPLICA_URL)
+
+
+def _sticky(request: Request) -> bool:
+    until = request.cookies.get(STICKY_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+
+async def read_session(request: Request) -> AsyncSession:
+    """A session for a read-only request: the replica when it may serve this client, else the primary.
+    The caller closes it (streamed responses outlive dependency sessions)."""
+    db = await replica.open() if replica.routable() and not _sticky(request) else None
+    if db is not None:
+        replica.reads += 1
+        return db
+    replica.primary_reads += 1
+    return async_session()
+
+
+# FastAPI dependency for read-only routes
+async def get_read_db(request: Request) -> AsyncIterator[AsyncSession]:
+    db = await read_session(request)
+    async with db:
+        try:
+            yield db
+        except Exception as e:
+            await db.rollback()
+            raise e
+
+
+class StickyWritesMiddleware:
+    """Sets the stickiness cookie on responses whose request committed to the primary."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS:
+            return await self.app(scope, receive, send)
+        flag = {"wrote": False}
+        token = _wrote.set(flag)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and flag["wrote"] and message["status"] < 400:
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", _cookie(scope))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _wrote.reset(token)
+
+
+def _cookie(scope) -> bytes:
+    window = settings.REPLICA_STICKY_SECONDS
+    # The frontend is cross-site, so over HTTPS the cookie must be SameSite=None (and then Secure)
+    site = "SameSite=None; Secure" if scope.get("scheme") == "https" else "SameSite=Lax"
+    return (f"{STICKY_COOKIE}={time.time() + window:.3f}; Max-Age={max(1, round(window))}; "
+            f"Path=/; HttpOnly; {site}").encode()
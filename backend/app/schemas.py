@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Literal, Any, Dict, Optional
+from pydantic import AfterValidator, BaseModel, Field, model_validator
+from typing import Annotated, List, Literal, Any, Dict, Optional
 from datetime import datetime
 
 class ProductIn(BaseModel):
@@ -14,6 +14,31 @@ class BCGPoint(BaseModel):
     growth: float
     quadrant: Literal["Star", "Cash Cow", "Question Mark", "Dog"]
 
+class BCGColumnsIn(BaseModel):
+    """Columnar BCG input: one list per field, all of equal length."""
+    name: List[str]
+    market_share: List[float]
+    largest_rival_share: List[float]
+    market_growth_rate: List[float]
+    growth_threshold: float = 10.0
+    rms_threshold: float = 1.0
+
+    @model_validator(mode="after")
+    def _check_columns(self):
+        n = len(self.name)
+        if not (len(self.market_share) == len(self.largest_rival_share) == len(self.market_growth_rate) == n):
+            raise ValueError("all columns must have the same length")
+        for col in (self.market_share, self.largest_rival_share):
+            if col and (min(col) < 0 or max(col) > 1):
+                raise ValueError("shares must be within 0..1")
+        return self
+
+class BCGColumnsOut(BaseModel):
+    name: List[str]
+    rms: List[float]
+    growth: List[float]
+    quadrant: List[Literal["Star", "Cash Cow", "Question Mark", "Dog"]]
+
 class SWOTIn(BaseModel):
     strengths: List[str] = []
     weaknesses: List[str] = []
@@ -23,6 +48,93 @@ class SWOTIn(BaseModel):
 class SWOTOut(SWOTIn):
     pass
 
+SWOTCategory = Literal["strengths", "weaknesses", "opportunities", "threats"]
+
+class SWOTMergeIn(BaseModel):
+    units: List[SWOTIn] = Field(..., max_length=10000)  # one SWOT per business unit
+    top: Optional[int] = Field(None, gt=0)  # keep the N most frequent items per category
+    # Optional search run against the fresh index, answered in `hits` (works on any worker)
+    q: Optional[str] = None
+    category: Optional[SWOTCategory] = None
+    limit: int = Field(50, gt=0, le=1000)
+
+class SWOTMergedItem(BaseModel):
+    text: str     # first spelling seen
+    count: int    # units mentioning it
+    share: float  # count / units
+
+class SWOTSearchHit(SWOTMergedItem):
+    category: SWOTCategory
+
+class SWOTMergeOut(BaseModel):
+    merge_id: str  # content hash; use with /swot/merge/{merge_id}/search
+    units: int
+    strengths: List[SWOTMergedItem]
+    weaknesses: List[SWOTMergedItem]
+    opportunities: List[SWOTMergedItem]
+    threats: List[SWOTMergedItem]
+    hits: Optional[List[SWOTSearchHit]] = None  # only when `q` was sent
+
+PORTER_FORCES = ("supplier", "buyer", "rivalry", "substitutes", "new_entrants")
+
+def _check_forces(keys) -> None:
+    unknown = set(keys) - set(PORTER_FORCES)
+    if unknown:
+        raise ValueError(f"unknown forces {sorted(unknown)}; expected {list(PORTER_FORCES)}")
+
+def _check_weights(weights: Dict[str, float]) -> None:
+    """Forces missing from `weights` weigh 1 everywhere (services/porter.weight_vector)."""
+    _check_forces(weights)
+    if any(w < 0 for w in weights.values()) or not sum(weights.get(k, 1.0) for k in PORTER_FORCES) > 0:
+        raise ValueError("weights must be >= 0 with a positive total (missing forces weigh 1)")
+
+def _forces(scores: Dict[str, float]) -> Dict[str, float]:
+    _check_forces(scores)
+    return scores
+
+# Per-force scores of one company (/porter); missing forces score 0
+PorterForcesIn = Annotated[Dict[str, float], AfterValidator(_forces)]
+
+class PorterWeightsIn(BaseModel):
+    name: str = Field(..., max_length=80)
+    industry: Optional[str] = None
+    weights: Dict[str, float]
+
+    @model_validator(mode="after")
+    def _check_weights(self):
+        _check_weights(self.weights)
+        return self
+
+class PorterWeightsOut(PorterWeightsIn):
+    id: str
+
+class PorterBatchIn(BaseModel):
+    """Columnar: one list of scores per force, aligned with `companies`."""
+    companies: List[str]
+    scores: Dict[str, List[float]]
+    weights: Optional[Dict[str, float]] = None  # explicit weights (missing forces weigh 1), or
+    profile: Optional[str] = None               # a stored profile name; neither = equal weights
+
+    @model_validator(mode="after")
+    def _check_columns(self):
+        _check_forces(self.scores)
+        if self.weights is not None:
+            _check_weights(self.weights)
+        if self.weights is not None and self.profile is not None:
+            raise ValueError("give either 'weights' or 'profile', not both")
+        if any(len(v) != len(self.companies) for v in self.scores.values()):
+            raise ValueError("every score column must have one value per company")
+        return self
+
+class PorterBatchOut(BaseModel):
+    companies: List[str]
+    weights: Dict[str, float]
+    overall: List[float]
+    overall_rank: List[int]             # 1 = highest overall score
+    overall_percentile: List[float]     # % of the batch scoring <= this company
+    force_rank: Dict[str, List[int]]
+    force_percentile: Dict[str, List[float]]
+
 class SnapshotIn(BaseModel):
     kind: Literal["SWOT","BCG","PESTLE","PORTER","VRIO","ANSOFF"]
     payload: Dict[str, Any]
@@ -32,6 +144,39 @@ class SnapshotOut(SnapshotIn):
     id: str
     created_at: datetime
 
+class SnapshotSummaryOut(BaseModel):
+    id: str
+    kind: str
+    note: Optional[str] = None
+    created_at: datetime
+    payload_size: Optional[int] = None  # bytes of compact JSON; null for rows stored before sizes were tracked
+
+class QuadrantMove(BaseModel):
+    name: str
+    from_quadrant: Optional[str] = None
+    to_quadrant: Optional[str] = None
+
+class ValueChange(BaseModel):
+    before: Any = None
+    after: Any = None
+
+class SnapshotDiffOut(BaseModel):
+    a: str
+    b: str
+    kind_a: str
+    kind_b: str
+    moves: List[QuadrantMove] = []
+    added: Dict[str, List[str]] = {}
+    removed: Dict[str, List[str]] = {}
+    changed: Dict[str, ValueChange] = {}
+
+class TrendPointOut(BaseModel):
+    snapshot_id: str
+    created_at: datetime
+    metric: str
+    value: Optional[float] = None  # numeric metrics
+    label: Optional[str] = None    # categorical metrics, e.g. quadrant
+
 class CompanyIn(BaseModel):
     name: str
     industry: Optional[str] = None
@@ -61,6 +206,26 @@ class ProductCreate(BaseModel):
 class ProductOut(ProductCreate):
     id: str
 
+class RollupOut(BaseModel):
+    """Aggregates over a set of products; shares are 0..1, and None when no product has the inputs."""
+    products: int
+    revenue: Optional[float] = None                 # SUM(revenue)
+    avg_market_share: Optional[float] = None
+    revenue_weighted_share: Optional[float] = None  # SUM(revenue * share) / SUM(revenue), products with both
+
+class MarketRollupOut(RollupOut):
+    market_id: Optional[str] = None  # None groups the company's products without a market
+    market_name: Optional[str] = None
+    hhi: Optional[float] = None  # 10000 * SUM(share^2) over the market's products
+
+class MarketSummaryOut(MarketRollupOut):
+    company_id: Optional[str] = None
+
+class CompanySummaryOut(RollupOut):
+    company_id: str
+    company_name: str
+    markets: List[MarketRollupOut] = []  # by revenue, highest first
+
 class MarketCtx(BaseModel):
     name: str
     growth_rate: float  # percent
@@ -89,3 +254,104 @@ class MarketsBulkOut(BaseModel):
 
 class ProductsBulkOut(BaseModel):
     items: List[ProductOut]
+
+class CompaniesBulkIn(BaseModel):
+    items: List[CompanyIn]
+
+class UpsertOut(BaseModel):
+    """Counts over distinct natural keys (a key repeated within one request counts once, last wins)."""
+    inserted: int
+    updated: int
+    unchanged: int
+
+class BulkIngestOut(BaseModel):
+    inserted: int
+
+AnalysisKind = Literal["bcg", "bcg_columnar", "swot", "porter", "porter_batch", "ai_suggest_swot"]
+
+class BatchJobIn(BaseModel):
+    kind: AnalysisKind
+    payload: Any  # validated per job, so one bad payload only fails its own line
+    id: Optional[str] = None  # echoed back to correlate results
+
+class BatchIn(BaseModel):
+    jobs: List[BatchJobIn] = Field(..., max_length=1000)
+    timeout: Optional[float] = Field(None, gt=0, description="per-job seconds; defaults to BATCH_JOB_TIMEOUT")
+
+class JobIn(BaseModel):
+    kind: AnalysisKind
+    payload: Any  # validated when the job runs; a bad payload fails the job, not the submission
+
+class JobOut(BaseModel):
+    id: str
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Any = None
+    error: Optional[str] = None
+
+class ParamSpec(BaseModel):
+    """One swept parameter: either a grid of values or a distribution to sample."""
+    grid: Optional[List[float]] = None
+    dist: Optional[Literal["normal", "uniform"]] = None
+    mean: float = 0.0  # normal
+    sd: float = 0.0    # normal
+    low: float = 0.0   # uniform
+    high: float = 0.0  # uniform
+
+    @model_validator(mode="after")
+    def _one_of(self):
+        if (self.grid is None) == (self.dist is None):
+            raise ValueError("give exactly one of 'grid' or 'dist'")
+        if self.grid is not None and not self.grid:
+            raise ValueError("grid must not be empty")
+        return self
+
+class PorterSimIn(BaseModel):
+    forces: Dict[str, float]  # base force scores
+    weights: Dict[str, ParamSpec] = {}  # swept weights; unlisted forces keep weight 1, unlisted scores are 0
+
+    @model_validator(mode="after")
+    def _check_names(self):
+        _check_forces(self.forces)
+        _check_forces(self.weights)
+        return self
+
+class SimulateIn(BaseModel):
+    portfolio: BCGColumnsIn
+    growth_shift: Optional[ParamSpec] = None       # percentage points added to market growth
+    share_shift: Optional[ParamSpec] = None        # added to own market share (0..1 scale, clipped)
+    rival_share_shift: Optional[ParamSpec] = None  # added to largest rival share (0..1 scale, clipped)
+    porter: Optional[PorterSimIn] = None
+    # Monte Carlo when any parameter has a distribution (grid parameters are then sampled uniformly);
+    # otherwise the full cartesian grid is evaluated
+    n_scenarios: int = Field(1000, ge=1)
+    per_product: bool = False  # Monte Carlo: draw independently per product instead of per scenario
+    seed: Optional[int] = None
+
+class DistributionStats(BaseModel):
+    mean: float
+    std: float
+    min: float
+    p5: float
+    p50: float
+    p95: float
+    max: float
+
+class PorterSimOut(BaseModel):
+    scenarios: int
+    overall: DistributionStats
+    histogram_edges: List[float]
+    histogram_counts: List[int]
+
+class SimulateOut(BaseModel):
+    scenarios: int
+    products: int
+    quadrants: List[str]
+    base_counts: List[int]
+    transitions: List[List[int]]          # [from base quadrant][to scenario quadrant], over scenario x product
+    transition_probs: List[List[float]]   # row-normalized transitions
+    quadrant_counts: Dict[str, DistributionStats]  # products per quadrant across scenarios
+    porter: Optional[PorterSimOut] = None
@@ -1,21 +1,52 @@
-from typing import List
+from typing import List, Sequence, Dict, Any
+import numpy as np
 from ..schemas import ProductIn, BCGPoint
 
 GROWTH_THRESHOLD = 10.0
 RMS_THRESHOLD = 1.0
 
+# Indexed by (rms < rms_threshold) * 2 + (growth < growth_threshold)
+QUADRANTS = np.array(["Star", "Cash Cow", "Question Mark", "Dog"], dtype=object)
+
+
+def classify_arrays(share, rival_share, growth,
+                    growth_threshold: float = GROWTH_THRESHOLD,
+                    rms_threshold: float = RMS_THRESHOLD):
+    """Vectorized BCG core: returns (rms, growth, quadrant_codes) as NumPy arrays."""
+    share = np.asarray(share, dtype=np.float64)
+    rival_share = np.asarray(rival_share, dtype=np.float64)
+    growth = np.asarray(growth, dtype=np.float64)
+    rms = share / np.maximum(rival_share, 1e-9)
+    codes = (~(rms >= rms_threshold)).astype(np.int8) * 2 + (~(growth >= growth_threshold)).astype(np.int8)
+    # A NaN only fails its own comparison (NaN growth with rms >= 1 would be "Cash Cow"), and inf passes it:
+    # an item without a finite position on either axis is "Dog", as the scalar branches did for NaN
+    codes = np.where(np.isfinite(rms) & np.isfinite(growth), codes, np.int8(3))
+    return rms, growth, codes
+
+
+def classify_bcg_columns(names: Sequence[str], share: Sequence[float], rival_share: Sequence[float],
+                         growth: Sequence[float],
+                         growth_threshold: float = GROWTH_THRESHOLD,
+                         rms_threshold: float = RMS_THRESHOLD) -> Dict[str, List[Any]]:
+    rms, g, codes = classify_arrays(share, rival_share, growth, growth_threshold, rms_threshold)
+    return {
+        "name": list(names),
+        "rms": rms.tolist(),
+        "growth": g.tolist(),
+        "quadrant": QUADRANTS[codes].tolist(),
+    }
+
+
 def classify_bcg(products: List[ProductIn]) -> List[BCGPoint]:
-    out: List[BCGPoint] = []
-    for p in products:
-        rms = p.market_share / max(p.largest_rival_share, 1e-9)
-        g = p.market_growth_rate
-        if g >= GROWTH_THRESHOLD and rms >= RMS_THRESHOLD:
-            q = "Star"
-        elif g < GROWTH_THRESHOLD and rms >= RMS_THRESHOLD:
-            q = "Cash Cow"
-        elif g >= GROWTH_THRESHOLD and rms < RMS_THRESHOLD:
-            q = "Question Mark"
-        else:
-            q = "Dog"
-        out.append(BCGPoint(name=p.name, rms=rms, growth=g, quadrant=q))
-    return out
+    if not products:
+        return []
+    cols = classify_bcg_columns(
+        [p.name for p in products],
+        [p.market_share for p in products],
+        [p.largest_rival_share for p in products],
+        [p.market_growth_rate for p in products],
+    )
+    return [
+        BCGPoint(name=n, rms=r, growth=g, quadrant=q)
+        for n, r, g, q in zip(cols["name"], cols["rms"], cols["growth"], cols["quadrant"])
+    ]
@@ -1,7 +1,66 @@
-from typing import Dict
+from typing import Dict, Mapping, Optional, Sequence
 
-def forces_index(inputs: Dict[str, float]) -> Dict[str, float]:
-    weights = {"supplier":1, "buyer":1, "rivalry":1, "substitutes":1, "new_entrants":1}
-    total = sum(weights.values())
-    score = sum(inputs.get(k, 0.0) * w for k, w in weights.items()) / total
+import numpy as np
+
+from ..schemas import PORTER_FORCES
+
+DEFAULT_WEIGHT = 1.0  # for any force a weighting leaves out; give 0 to ignore a force
+
+
+def weight_vector(weights: Optional[Mapping[str, float]] = None) -> np.ndarray:
+    """Weights in PORTER_FORCES order; forces missing from `weights` get DEFAULT_WEIGHT."""
+    weights = weights or {}
+    return np.asarray([float(weights.get(k, DEFAULT_WEIGHT)) for k in PORTER_FORCES], dtype=np.float64)
+
+
+def weighted_scores(matrix, weights) -> np.ndarray:
+    """Overall score per row of scores x weights (broadcast over the last axis), normalized by total weight."""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    num = (matrix * weights).sum(axis=-1)
+    total = np.broadcast_to(weights.sum(axis=-1), num.shape)
+    return np.divide(num, total, out=np.zeros_like(num), where=total != 0)
+
+
+def _rank_and_percentile(x: np.ndarray):
+    """Competition rank (1 = highest, ties share the best rank) and percent of the batch <= value."""
+    s = np.sort(x)
+    le = np.searchsorted(s, x, side="right")
+    return (len(x) - le + 1).astype(np.int64), le * (100.0 / len(x))
+
+
+def score_batch(matrix, weights: Optional[Mapping[str, float]] = None) -> Dict:
+    """Score N companies x len(PORTER_FORCES) forces in one pass, with per-force rankings across the batch."""
+    matrix = np.asarray(matrix, dtype=np.float64).reshape(-1, len(PORTER_FORCES))
+    w = weight_vector(weights)
+    overall = weighted_scores(matrix, w)
+    out = {"weights": dict(zip(PORTER_FORCES, w.tolist())), "overall": overall.tolist(),
+           "overall_rank": [], "overall_percentile": [], "force_rank": {}, "force_percentile": {}}
+    if len(matrix) == 0:
+        out["force_rank"] = {k: [] for k in PORTER_FORCES}
+        out["force_percentile"] = {k: [] for k in PORTER_FORCES}
+        return out
+    r, p = _rank_and_percentile(overall)
+    out["overall_rank"], out["overall_percentile"] = r.tolist(), p.tolist()
+    for i, k in enumerate(PORTER_FORCES):
+        r, p = _rank_and_percentile(matrix[:, i])
+        out["force_rank"][k] = r.tolist()
+        out["force_percentile"][k] = p.tolist()
+    return out
+
+
+def score_columns(scores: Mapping[str, Sequence[float]], n: int,
+                  weights: Optional[Mapping[str, float]] = None) -> Dict:
+    """score_batch over columnar input; forces without a column score 0."""
+    zeros = np.zeros(n)
+    matrix = np.column_stack([np.asarray(scores[k], dtype=np.float64) if k in scores else zeros
+                              for k in PORTER_FORCES]) if n else np.zeros((0, len(PORTER_FORCES)))
+    return score_batch(matrix, weights)
+
+
+def forces_index(inputs: Dict[str, float], weights: Optional[Mapping[str, float]] = None) -> Dict[str, float]:
+    """Weighted mean over all forces; a force missing from `inputs` scores 0."""
+    w = weight_vector(weights)
+    total = float(w.sum())
+    score = sum(inputs.get(k, 0.0) * wk for k, wk in zip(PORTER_FORCES, w.tolist())) / total if total else 0.0
     return {"per_force": inputs, "overall": score}
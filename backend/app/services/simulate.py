@@ -0,0 +1,122 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..schemas import PORTER_FORCES, ParamSpec, PorterSimIn, SimulateIn
+from .bcg import QUADRANTS, classify_arrays
+from .porter import DEFAULT_WEIGHT, weighted_scores
+
+# Scenarios evaluated per vectorized block; bounds peak memory at CHUNK x products per array
+CHUNK = 1024
+MAX_SCENARIOS = 1_000_000
+
+
+def _is_mc(specs: List[Optional[ParamSpec]]) -> bool:
+    return any(s is not None and s.dist is not None for s in specs)
+
+
+def _sample(spec: ParamSpec, shape, rng: np.random.Generator) -> np.ndarray:
+    if spec.grid is not None:
+        return rng.choice(np.asarray(spec.grid, dtype=np.float64), size=shape)
+    if spec.dist == "normal":
+        return rng.normal(spec.mean, spec.sd, size=shape)
+    return rng.uniform(spec.low, spec.high, size=shape)
+
+
+def _grid(specs: List[Optional[ParamSpec]]) -> np.ndarray:
+    """Cartesian product of the grids -> (scenarios, len(specs)); absent params are 0."""
+    axes = [np.asarray(s.grid, dtype=np.float64) if s is not None else np.zeros(1) for s in specs]
+    n = int(np.prod([len(a) for a in axes]))
+    if n > MAX_SCENARIOS:
+        raise ValueError(f"grid expands to {n} scenarios (max {MAX_SCENARIOS})")
+    mesh = np.meshgrid(*axes, indexing="ij")
+    return np.stack([m.ravel() for m in mesh], axis=1)
+
+
+def _stats(x: np.ndarray) -> Dict[str, float]:
+    p5, p50, p95 = np.percentile(x, [5, 50, 95])
+    return {"mean": float(x.mean()), "std": float(x.std()), "min": float(x.min()),
+            "p5": float(p5), "p50": float(p50), "p95": float(p95), "max": float(x.max())}
+
+
+def _bcg(body: SimulateIn, rng: np.random.Generator) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    """Returns (scenarios, base_codes, transitions 4x4, per-scenario quadrant counts Sx4)."""
+    pf = body.portfolio
+    share = np.asarray(pf.market_share, dtype=np.float64)
+    rival = np.asarray(pf.largest_rival_share, dtype=np.float64)
+    growth = np.asarray(pf.market_growth_rate, dtype=np.float64)
+    gt, rt = pf.growth_threshold, pf.rms_threshold
+    _, _, base = classify_arrays(share, rival, growth, gt, rt)
+    P = len(share)
+
+    specs = [body.growth_shift, body.share_shift, body.rival_share_shift]
+    mc = _is_mc(specs)
+    if mc:
+        S = body.n_scenarios
+        if S > MAX_SCENARIOS:
+            raise ValueError(f"n_scenarios exceeds {MAX_SCENARIOS}")
+        grid = None
+    else:
+        grid = _grid(specs)
+        S = len(grid)
+
+    transitions = np.zeros(16, dtype=np.int64)
+    counts = np.empty((S, 4), dtype=np.int64)
+    for lo in range(0, S, CHUNK):
+        n = min(CHUNK, S - lo)
+        if mc:
+            shape = (n, P) if body.per_product else (n, 1)
+            dg, ds, dr = (_sample(s, shape, rng) if s is not None else 0.0 for s in specs)
+        else:
+            block = grid[lo:lo + n]
+            dg, ds, dr = (block[:, i:i + 1] for i in range(3))
+        _, _, codes = classify_arrays(
+            np.clip(share + ds, 0.0, 1.0), np.clip(rival + dr, 0.0, 1.0), growth + dg, gt, rt)
+        codes = np.broadcast_to(codes, (n, P)).astype(np.int64)
+        transitions += np.bincount((base.astype(np.int64) * 4 + codes).ravel(), minlength=16)
+        offsets = np.arange(n, dtype=np.int64)[:, None] * 4
+        counts[lo:lo + n] = np.bincount((codes + offsets).ravel(), minlength=n * 4).reshape(n, 4)
+    return S, base, transitions.reshape(4, 4), counts
+
+
+def _porter(p: PorterSimIn, n_scenarios: int, rng: np.random.Generator) -> Dict:
+    # Same rule as services/porter.py: every force counts, missing scores are 0, unswept weights DEFAULT_WEIGHT
+    x = np.asarray([p.forces.get(k, 0.0) for k in PORTER_FORCES], dtype=np.float64)
+    specs = [p.weights.get(k) for k in PORTER_FORCES]
+    if _is_mc(specs):
+        S = n_scenarios
+        w = np.column_stack([_sample(s, S, rng) if s is not None else np.full(S, DEFAULT_WEIGHT) for s in specs])
+    else:
+        axes = [np.asarray(s.grid, dtype=np.float64) if s is not None else np.full(1, DEFAULT_WEIGHT) for s in specs]
+        S = int(np.prod([len(a) for a in axes]))
+        if S > MAX_SCENARIOS:
+            raise ValueError(f"porter grid expands to {S} scenarios (max {MAX_SCENARIOS})")
+        w = np.stack([m.ravel() for m in np.meshgrid(*axes, indexing="ij")], axis=1)
+    overall = weighted_scores(x, w)
+    lo, hi = float(overall.min()), float(overall.max())
+    if np.isclose(lo, hi):  # weights that don't move the score: one populated bin
+        hi = lo + 1.0
+    hist, edges = np.histogram(overall, bins=20, range=(lo, hi))
+    return {"scenarios": S, "overall": _stats(overall),
+            "histogram_edges": edges.tolist(), "histogram_counts": hist.tolist()}
+
+
+def simulate(body: SimulateIn) -> Dict:
+    """Evaluate every scenario in vectorized blocks and return only aggregates."""
+    rng = np.random.default_rng(body.seed)
+    S, base, transitions, counts = _bcg(body, rng)
+    rows = transitions.sum(axis=1, keepdims=True)
+    probs = np.divide(transitions, rows, out=np.zeros((4, 4)), where=rows != 0)
+    out = {
+        "scenarios": S,
+        "products": int(len(base)),
+        "quadrants": QUADRANTS.tolist(),
+        "base_counts": np.bincount(base, minlength=4).tolist(),
+        "transitions": transitions.tolist(),
+        "transition_probs": probs.tolist(),
+        "quadrant_counts": {q: _stats(counts[:, i].astype(np.float64)) for i, q in enumerate(QUADRANTS.tolist())},
+        "porter": None,
+    }
+    if body.porter is not None:
+        out["porter"] = _porter(body.porter, body.n_scenarios, rng)
+    return out
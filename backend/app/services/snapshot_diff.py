@@ -0,0 +1,117 @@
+"""Structural comparison of snapshot payloads, and the scalar points trend queries read.
+
+Payloads are free-form dicts, but the analysis kinds share a few shapes: lists of named items
+(BCG points, products), lists of strings (SWOT quadrants), and plain or one-level-nested scalars
+(Porter forces). Both functions below work on those shapes and leave anything else opaque.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MAX_LABEL = 160  # snapshot_points.subject / label width
+
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _named_items(v: Any) -> Optional[Dict[str, dict]]:
+    """{name: item} for a non-empty list of dicts that all carry a string `name`; else None."""
+    if not isinstance(v, list) or not v:
+        return None
+    if not all(isinstance(i, dict) and isinstance(i.get("name"), str) for i in v):
+        return None
+    out: Dict[str, dict] = {}
+    for i in v:
+        out.setdefault(i["name"], i)  # first occurrence wins on duplicate names
+    return out
+
+
+def _point(subject: str, metric: str, v: Any) -> Optional[Tuple[str, str, Optional[float], Optional[str]]]:
+    if _is_number(v):
+        return subject, metric, float(v), None
+    if isinstance(v, str) and len(v) <= MAX_LABEL:
+        return subject, metric, None, v
+    return None
+
+
+def iter_points(payload: Dict[str, Any]) -> Iterator[Tuple[str, str, Optional[float], Optional[str]]]:
+    """(subject, metric, value, label) for every trendable scalar in a payload.
+
+    Named items give one point per field with the item name as subject ("Widget", "rms");
+    top-level scalars and one-level dicts use subject "" ("", "forces.rivalry").
+    (subject, metric) is unique per payload.
+    """
+    seen = set()
+    for key, v in payload.items():
+        candidates = []
+        items = _named_items(v)
+        if items is not None:
+            for name, item in items.items():
+                if len(name) <= MAX_LABEL:
+                    candidates += [_point(name, f, x) for f, x in item.items() if f != "name"]
+        elif isinstance(v, dict):
+            candidates += [_point("", f"{key}.{f}", x) for f, x in v.items()]
+        else:
+            candidates.append(_point("", key, v))
+        for p in candidates:
+            if p is not None and len(p[1]) <= 80 and p[:2] not in seen:
+                seen.add(p[:2])
+                yield p
+
+
+def _ordered_minus(a: List[Any], b: List[Any]) -> List[Any]:
+    present = set(b)
+    return [x for x in a if x not in present]
+
+
+def diff_payloads(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """What changed going from payload `a` to payload `b`.
+
+    - moves: named items present in both whose `quadrant` differs
+    - added / removed: per top-level key, item names (named lists) or entries (string lists, e.g. SWOT)
+    - changed: dotted path -> {before, after} for every other differing scalar (missing = null)
+    """
+    moves: List[Dict[str, Any]] = []
+    added: Dict[str, List[str]] = {}
+    removed: Dict[str, List[str]] = {}
+    changed: Dict[str, Dict[str, Any]] = {}
+
+    def change(path: str, before: Any, after: Any) -> None:
+        if before != after:
+            changed[path] = {"before": before, "after": after}
+
+    for key in list(a) + [k for k in b if k not in a]:
+        va, vb = a.get(key), b.get(key)
+        ia = _named_items(va) if va else {}
+        ib = _named_items(vb) if vb else {}
+        if ia is not None and ib is not None and (ia or ib):
+            if plus := [n for n in ib if n not in ia]:
+                added[key] = plus
+            if minus := [n for n in ia if n not in ib]:
+                removed[key] = minus
+            for name in [n for n in ia if n in ib]:
+                before, after = ia[name], ib[name]
+                if before.get("quadrant") != after.get("quadrant"):
+                    moves.append({"name": name, "from_quadrant": before.get("quadrant"), "to_quadrant": after.get("quadrant")})
+                for f in [f for f in before if f not in ("name", "quadrant")] + [f for f in after if f not in before and f != "quadrant"]:
+                    change(f"{key}.{name}.{f}", before.get(f), after.get(f))
+        elif all(isinstance(v, list) and all(isinstance(x, str) for x in v) for v in (va or [], vb or [])) \
+                and isinstance(va or vb, list):
+            va, vb = va or [], vb or []
+            if plus := _ordered_minus(vb, va):
+                added[key] = plus
+            if minus := _ordered_minus(va, vb):
+                removed[key] = minus
+        elif isinstance(va, dict) and isinstance(vb, dict):
+            for f in list(va) + [f for f in vb if f not in va]:
+                change(f"{key}.{f}", va.get(f), vb.get(f))
+        else:
+            change(key, va, vb)
+
+    return {"moves": moves, "added": added, "removed": removed, "changed": changed}
+
+
+def point_rows(snapshot_id: str, kind: str, created_at, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """snapshot_points rows for one snapshot, ready for a bulk insert."""
+    return [{"snapshot_id": snapshot_id, "kind": kind, "created_at": created_at,
+             "subject": subject, "metric": metric, "value": value, "label": label}
+            for subject, metric, value, label in iter_points(payload)]
@@ -1,4 +1,170 @@
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
 from ..schemas import SWOTIn, SWOTOut
 
+CATEGORIES = ("strengths", "weaknesses", "opportunities", "threats")
+
+_WORD = re.compile(r"\w+")
+_SUFFIXES = ("ing", "es", "ed", "s")
+
+
+def canonical(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form used to dedupe items ("Price wars!" == "price  wars")."""
+    return " ".join(_WORD.findall(text.casefold()))
+
+
+@lru_cache(maxsize=1 << 16)  # vocabularies are small; stemming was most of the indexing time
+def term(word: str) -> str:
+    """Crude stem so "pricing", "prices" and "price" share one index term."""
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            word = word[:-len(suffix)]
+            break
+    return word[:-1] if len(word) > 3 and word.endswith("e") else word
+
+
+def dedupe(items: Iterable[str]) -> List[str]:
+    """First occurrence of each canonical form, trimmed; blank items dropped."""
+    seen: Set[str] = set()
+    out: List[str] = []
+    for x in items:
+        k = canonical(x)
+        if k and k not in seen:
+            seen.add(k)
+            out.append(x.strip())
+    return out
+
+
 def build_swot(swot: SWOTIn) -> SWOTOut:
     return SWOTOut(**swot.model_dump())
+
+
+class SWOTIndex:
+    """Merged view of many SWOTs: one entry per (category, canonical item), counted once per unit,
+    with an inverted index of stemmed terms -> entries for search (built on the first search).
+
+    Entries are parallel lists addressed by integer id; the text shown is the first spelling seen.
+    """
+
+    def __init__(self):
+        self.units = 0
+        self.category: List[str] = []
+        self.text: List[str] = []
+        self.key: List[str] = []
+        self.count: List[int] = []
+        self._last_unit: List[int] = []
+        self._ids: Dict[str, Dict[str, int]] = {c: {} for c in CATEGORIES}
+        self._canon: Dict[str, str] = {}  # raw text -> canonical; units repeat the same strings a lot
+        self._terms: Optional[Dict[str, Set[int]]] = None
+
+    def state(self) -> Dict:
+        """Plain-JSON form of the merged entries (for the shared cache); see from_state."""
+        return {"units": self.units, "category": self.category, "text": self.text, "key": self.key, "count": self.count}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "SWOTIndex":
+        index = cls()
+        index.units = state["units"]
+        index.category, index.text, index.key, index.count = state["category"], state["text"], state["key"], state["count"]
+        index._last_unit = [-1] * len(index.key)
+        for i, (cat, key) in enumerate(zip(index.category, index.key)):
+            index._ids[cat][key] = i
+        return index
+
+    def add(self, swot: SWOTIn) -> None:
+        unit = self.units
+        self.units += 1
+        self._terms = None
+        count, last, canon = self.count, self._last_unit, self._canon
+        for cat in CATEGORIES:
+            ids = self._ids[cat]
+            for raw in getattr(swot, cat):
+                key = canon.get(raw)
+                if key is None:
+                    key = canon[raw] = canonical(raw)
+                i = ids.get(key)
+                if i is None:
+                    if not key:
+                        continue
+                    i = ids[key] = len(self.text)
+                    self.category.append(cat)
+                    self.text.append(raw.strip())
+                    self.key.append(key)
+                    count.append(1)
+                    last.append(unit)
+                elif last[i] != unit:  # repeats within one unit count once
+                    count[i] += 1
+                    last[i] = unit
+
+    @property
+    def terms(self) -> Dict[str, Set[int]]:
+        if self._terms is None:
+            terms: Dict[str, Set[int]] = {}
+            for i, key in enumerate(self.key):
+                for t in {term(w) for w in key.split()}:
+                    bucket = terms.get(t)
+                    if bucket is None:
+                        terms[t] = {i}
+                    else:
+                        bucket.add(i)
+            self._terms = terms
+        return self._terms
+
+    def _ranked(self, ids: Iterable[int]) -> List[int]:
+        return sorted(ids, key=lambda i: (-self.count[i], i))  # most units first, then first seen
+
+    def _item(self, i: int) -> Dict:
+        return {"text": self.text[i], "count": self.count[i],
+                "share": self.count[i] / self.units if self.units else 0.0}
+
+    def merged(self, top: Optional[int] = None) -> Dict[str, List[Dict]]:
+        return {c: [self._item(i) for i in self._ranked(ids.values())[:top]] for c, ids in self._ids.items()}
+
+    def search(self, query: str, category: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Entries containing every query term (stemmed), ranked by frequency across units."""
+        words = {term(w) for w in canonical(query).split()}
+        if not words:
+            return []
+        postings = sorted((self.terms.get(t, set()) for t in words), key=len)
+        hits = set(postings[0]).intersection(*postings[1:])
+        if category:
+            hits = {i for i in hits if self.category[i] == category}
+        return [{"category": self.category[i], **self._item(i)} for i in self._ranked(hits)[:limit]]
+
+
+def merge_swots(units: Sequence[SWOTIn]) -> SWOTIndex:
+    index = SWOTIndex()
+    for swot in units:
+        index.add(swot)
+    return index
+
+
+class IndexStore:
+    """Small LRU of merged indexes by merge id, so searches don't re-merge. Per process; the app also
+    puts each index's state in the result cache, whose shared backend other workers can read."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, SWOTIndex]" = OrderedDict()
+        self._lock = Lock()
+
+    def put(self, key: str, index: SWOTIndex) -> None:
+        with self._lock:
+            self._items[key] = index
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def get(self, key: str) -> Optional[SWOTIndex]:
+        with self._lock:
+            index = self._items.get(key)
+            if index is not None:
+                self._items.move_to_end(key)
+            return index
+
+
+merged_indexes = IndexStore()
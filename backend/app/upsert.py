@@ -0,0 +1,58 @@
+"""Batched INSERT ... ON CONFLICT DO UPDATE on natural keys, for PostgreSQL and SQLite.
+
+Rows carry a client-side id (ingest.prepare_row). The update only fires when some column actually
+differs, and RETURNING yields the id of every row that was written. So an id we proposed means
+inserted, any other id means updated, and rows that come back with no id were unchanged. No
+per-row read-back is needed.
+"""
+import uuid
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db import backend_name
+from .models import Company, Market, Product
+
+NATURAL_KEYS = {Company: ("name",), Market: ("company_id", "name"), Product: ("company_id", "name")}
+UPSERT_BATCH = 500
+
+
+def upsert_statement(model, dialect: str):
+    table = model.__table__
+    keys = NATURAL_KEYS[model]
+    stmt = (pg_insert if dialect == "postgresql" else sqlite_insert)(table)
+    data = [c for c in table.columns if c.name not in keys and c.name != "id"]
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c[k] for k in keys],
+        set_={c.name: stmt.excluded[c.name] for c in data},
+        where=or_(*[c.is_distinct_from(stmt.excluded[c.name]) for c in data]),
+    ).returning(table.c.id)
+
+
+def dedupe(model, rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One row per natural key (the last one wins); a single statement can't touch a row twice."""
+    keys = NATURAL_KEYS[model]
+    out: Dict[Tuple, Dict[str, Any]] = {}
+    for r in rows:
+        key = tuple(r.get(k) for k in keys)
+        if None in key:
+            raise ValueError(f"{', '.join(keys)} required for upsert")
+        out[key] = r
+    return list(out.values())
+
+
+async def upsert_rows(db: AsyncSession, model, rows: Sequence[Dict[str, Any]]) -> Tuple[List[uuid.UUID], List[uuid.UUID], int]:
+    """(inserted ids, updated ids, unchanged count) over distinct natural keys; caller owns the transaction."""
+    rows = dedupe(model, rows)
+    stmt = upsert_statement(model, backend_name())
+    inserted: List[uuid.UUID] = []
+    updated: List[uuid.UUID] = []
+    for i in range(0, len(rows), UPSERT_BATCH):
+        chunk = rows[i:i + UPSERT_BATCH]
+        proposed = {r["id"] for r in chunk}
+        for rid in (await db.execute(stmt, chunk)).scalars():
+            (inserted if rid in proposed else updated).append(rid)
+    return inserted, updated, len(rows) - len(inserted) - len(updated)
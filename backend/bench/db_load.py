@@ -0,0 +1,122 @@
+"""Mixed read/write load against the app, in-process (no network).
+
+Run from backend/ (needs httpx):
+    python -m bench.db_load --requests 2000 --concurrency 32
+
+Point DATABASE_URL at Postgres to load that backend instead of the SQLite file.
+Compare before/after by running the same command on both revisions: copy this file over the older
+checkout's backend/bench/ (it only uses app.main.app, its startup/shutdown handlers and app.db), then
+run it there against a fresh database. Failed requests are counted per route rather than aborting the
+run: older revisions 500 on some routes, and SQLite at high concurrency reports "database is locked".
+Before the async engine, routes block the event loop on sync pool checkouts, so keep --concurrency
+at or below the sync pool size (15) there or requests stall until DB_POOL_TIMEOUT.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+from app import db
+from app.main import app
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+async def _handlers(handlers) -> None:
+    for h in handlers:  # no lifespan under ASGITransport; older revisions have sync handlers
+        if asyncio.iscoroutine(result := h()):
+            await result
+
+
+def _backend_name() -> str:
+    if hasattr(db, "backend_name"):
+        return db.backend_name()
+    return db.engine.url.get_backend_name()  # revisions before the lazy engine
+
+
+async def run(total: int, concurrency: int, write_ratio: float, seed: int) -> dict:
+    await _handlers(app.router.on_startup)
+    try:
+        return await _drive(total, concurrency, write_ratio, seed)
+    finally:
+        await _handlers(app.router.on_shutdown)
+
+
+async def _drive(total: int, concurrency: int, write_ratio: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    lat = defaultdict(list)
+    errors = defaultdict(int)
+    # raise_app_exceptions=False: an unhandled error becomes a 500 and is counted, not fatal
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        # Company names are unique: a fresh one per run, so reruns on the same database don't 409
+        r = await c.post("/companies", json={"name": f"bench-co-{uuid.uuid4().hex[:12]}"})
+        r.raise_for_status()
+        co = r.json()
+        queue: asyncio.Queue = asyncio.Queue()
+        for i in range(total):
+            queue.put_nowait(i)
+
+        async def call(label, method, url, **kw):
+            t = time.perf_counter()
+            r = await c.request(method, url, **kw)
+            lat[label].append((time.perf_counter() - t) * 1000)
+            if r.status_code >= 400:
+                errors[label] += 1
+
+        async def worker():
+            while not queue.empty():
+                i = queue.get_nowait()
+                roll = rng.random()
+                if i % 10 == 0:
+                    await call("GET /health", "GET", "/health")
+                elif roll < write_ratio / 2:
+                    await call("POST /snapshots", "POST", "/snapshots",
+                               json={"kind": "BCG", "payload": {"i": i}})
+                elif roll < write_ratio:
+                    await call("POST /products", "POST", "/products",
+                               json={"company_id": co["id"], "name": f"p{i}", "market_share": 0.1})
+                elif roll < (1 + write_ratio) / 2:
+                    await call("GET /snapshots", "GET", "/snapshots", params={"limit": 20})
+                else:
+                    await call("GET /products", "GET", "/products", params={"company_id": co["id"]})
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    return {
+        "backend": _backend_name(),
+        "requests": total,
+        "concurrency": concurrency,
+        "rps": round(total / elapsed, 1),
+        "errors": sum(errors.values()),
+        "routes": {
+            k: {"n": len(v), "errors": errors[k], "p50_ms": round(statistics.median(v), 2),
+                "p99_ms": round(pct(v, 99), 2)}
+            for k, v in sorted(lat.items())
+        },
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--write-ratio", type=float, default=0.3)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.concurrency, args.write_ratio, args.seed)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
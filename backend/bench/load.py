@@ -0,0 +1,333 @@
+"""In-process ASGI load harness for app.main.app on SQLite and PostgreSQL.
+
+Run from backend/ (needs httpx):
+    python -m bench.load --backend both --out load.json
+    python -m bench.load --backend sqlite --companies 50 --requests 5000 --concurrency 64
+    python -m bench.report compare load-baseline.json load.json
+
+Each backend runs in its own child process and scratch directory, so DATABASE_URL, the SQLite file
+and engine state never leak between runs. The child migrates the schema, seeds companies x markets x
+products with Core inserts, runs the app's startup handlers, then drives a weighted mix over every
+route through httpx.ASGITransport (no network). PostgreSQL comes from --pg-url / BENCH_PG_URL.
+Otherwise, if initdb and pg_ctl are on PATH, a throwaway local cluster is started (the stand-in).
+If neither exists, that backend is skipped.
+
+Results have one case per backend and route ("sqlite GET /products": p50_ms, p99_ms, n, errors) plus
+"<backend> total": throughput_per_s and peak_rss_kb.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .report import pct, peak_rss_kb, write
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORCES = ("supplier", "buyer", "rivalry", "substitutes", "new_entrants")
+
+
+# ---------------------------------------------------------------- parent: one child per backend
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def pg_standin():
+    """Throwaway PostgreSQL cluster in a temp dir (unix socket only); yields its URL, or None."""
+    initdb, pg_ctl = shutil.which("initdb"), shutil.which("pg_ctl")
+    if not (initdb and pg_ctl):
+        yield None
+        return
+    with tempfile.TemporaryDirectory(prefix="bench-pg-") as tmp:
+        data, port = os.path.join(tmp, "data"), _free_port()
+        subprocess.run([initdb, "-D", data, "-U", "bench", "--auth=trust"], check=True, capture_output=True)
+        subprocess.run([pg_ctl, "-D", data, "-w", "-l", os.path.join(tmp, "log"),
+                        "-o", f"-p {port} -k {tmp} -c listen_addresses=''"], check=True, capture_output=True)
+        try:
+            yield f"postgresql://bench@/postgres?host={tmp}&port={port}"
+        finally:
+            subprocess.run([pg_ctl, "-D", data, "-m", "fast", "stop"], capture_output=True)
+
+
+def run_child(backend: str, url: Optional[str], argv: List[str]) -> dict:
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    if url:
+        env["DATABASE_URL"] = url
+    with tempfile.TemporaryDirectory(prefix=f"bench-{backend}-") as cwd:
+        proc = subprocess.run([sys.executable, "-m", "bench.load", "--child", backend, *argv],
+                              cwd=cwd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{backend} run failed:\n{proc.stderr[-4000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ---------------------------------------------------------------- child: seed, then load
+
+def seed(url: str, companies: int, markets: int, products: int, rng: random.Random) -> dict:
+    """Schema via app.migrate, then bulk Core inserts; returns ids the route mix needs."""
+    import uuid
+    from sqlalchemy import create_engine, insert, true
+    from app.materialize import refresh_statements
+    from app.migrate import migrate
+    from app.models import Company, Market, Product
+
+    migrate(url)
+    co_rows, mk_rows, pr_rows = [], [], []
+    for c in range(companies):
+        cid = uuid.uuid4()
+        co_rows.append({"id": cid, "name": f"company-{c:05d}", "industry": rng.choice(("retail", "saas", "energy"))})
+        for m in range(markets):
+            mid = uuid.uuid4()
+            mk_rows.append({"id": mid, "company_id": cid, "name": f"market-{m:04d}",
+                            "growth_rate": round(rng.uniform(-5, 30), 2), "size": round(rng.uniform(1e5, 1e8), 2)})
+            for p in range(products):
+                pr_rows.append({"id": uuid.uuid4(), "company_id": cid, "market_id": mid, "name": f"product-{m:04d}-{p:05d}",
+                                "market_share": round(rng.random(), 4), "largest_rival_share": round(rng.random(), 4),
+                                "price": round(rng.uniform(1, 500), 2), "revenue": round(rng.uniform(1e3, 1e7), 2)})
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        for model, rows in ((Company, co_rows), (Market, mk_rows), (Product, pr_rows)):
+            for i in range(0, len(rows), 5000):
+                conn.execute(insert(model), rows[i:i + 5000])
+        for stmt in refresh_statements(true()):
+            conn.execute(stmt)
+    engine.dispose()
+    return {"companies": [str(r["id"]) for r in co_rows],
+            "markets": [(str(r["company_id"]), str(r["id"])) for r in mk_rows]}
+
+
+def _bcg_items(rng, n):
+    return [{"name": f"p{i}", "market_share": rng.random(), "largest_rival_share": rng.random(),
+             "market_growth_rate": rng.uniform(-10, 30)} for i in range(n)]
+
+
+def _swot(rng):
+    words = ("pricing", "supply", "brand", "talent", "regulation", "digital", "margin", "churn", "logistics")
+    return {c: [" ".join(rng.sample(words, 2)) for _ in range(6)] for c in ("strengths", "weaknesses", "opportunities", "threats")}
+
+
+def route_mix(ids: dict, rng: random.Random, variants: int) -> List[Tuple[str, int, Callable]]:
+    """(label, weight, build) where build(c, state) returns (method, url, kwargs).
+
+    Analysis bodies come from `variants` seeded choices per route, so the result cache sees a
+    realistic mix of hits and misses."""
+    companies, markets = ids["companies"], ids["markets"]
+    pools = {
+        "bcg": [_bcg_items(rng, 50) for _ in range(variants)],
+        "swot": [_swot(rng) for _ in range(variants)],
+        "porter": [{k: round(rng.uniform(1, 5), 2) for k in FORCES} for _ in range(variants)],
+        "porter_batch": [{"companies": [f"c{i}" for i in range(200)],
+                          "scores": {k: [rng.uniform(1, 5) for _ in range(200)] for k in FORCES}} for _ in range(variants)],
+    }
+    cols = lambda items: {"name": [i["name"] for i in items], "market_share": [i["market_share"] for i in items],
+                          "largest_rival_share": [i["largest_rival_share"] for i in items],
+                          "market_growth_rate": [i["market_growth_rate"] for i in items]}
+    pick = lambda k: rng.choice(pools[k])
+    seq = iter(range(10 ** 9))
+
+    def product(cid, mid, n):
+        return {"company_id": cid, "market_id": mid, "name": f"load-{n}", "market_share": round(rng.random(), 4),
+                "largest_rival_share": round(rng.random(), 4)}
+
+    def new_product(c, st):
+        cid, mid = rng.choice(markets)
+        return "POST", "/products", {"json": product(cid, mid, next(seq))}
+
+    def upsert(c, st):
+        cid, mid = rng.choice(markets)
+        # its own name range, so upserts update rows they created and never collide with POST /products
+        items = [{**product(cid, mid, 0), "name": f"sync-{rng.randrange(500)}"} for _ in range(20)]
+        return "POST", "/products/upsert", {"json": {"items": items}}
+
+    def bulk_stream(c, st):
+        cid, mid = rng.choice(markets)
+        body = "\n".join(json.dumps(product(cid, mid, next(seq))) for _ in range(20))
+        return "POST", "/products/bulk/stream", {"content": body, "headers": {"content-type": "application/x-ndjson"}}
+
+    def snapshot(c, st):
+        items = [{"name": f"p{i}", "rms": round(rng.uniform(0, 3), 3), "growth": round(rng.uniform(-5, 25), 2),
+                  "quadrant": rng.choice(("Star", "Cash Cow", "Question Mark", "Dog"))} for i in range(10)]
+        return "POST", "/snapshots", {"json": {"kind": "BCG", "payload": {"items": items}}}
+
+    def snap_get(c, st):
+        return ("GET", f"/snapshots/{rng.choice(st['snapshots'])}", {}) if st["snapshots"] else snapshot(c, st)
+
+    def snap_diff(c, st):
+        if len(st["snapshots"]) < 2:
+            return snapshot(c, st)
+        a, b = rng.sample(st["snapshots"], 2)
+        return "GET", "/snapshots/diff", {"params": {"a": a, "b": b}}
+
+    def merge_search(c, st):
+        if not st["merges"]:
+            return "POST", "/swot/merge", {"json": {"units": [pick("swot") for _ in range(20)]}}
+        return "GET", f"/swot/merge/{rng.choice(st['merges'])}/search", {"params": {"q": "pricing"}}
+
+    def job_get(c, st):
+        if not st["jobs"]:
+            return "POST", "/jobs", {"json": {"kind": "bcg", "payload": pick("bcg")}}
+        return "GET", f"/jobs/{rng.choice(st['jobs'])}", {}
+
+    return [
+        ("GET /health", 2, lambda c, st: ("GET", "/health", {})),
+        ("GET /companies", 4, lambda c, st: ("GET", "/companies", {"params": {"limit": 50}})),
+        ("GET /markets", 4, lambda c, st: ("GET", "/markets", {"params": {"company_id": rng.choice(companies)}})),
+        ("GET /products", 8, lambda c, st: ("GET", "/products", {"params": {"company_id": rng.choice(companies), "limit": 200}})),
+        ("GET /companies/{id}/bcg", 6, lambda c, st: ("GET", f"/companies/{rng.choice(companies)}/bcg", {})),
+        ("POST /products", 3, new_product),
+        ("POST /products/upsert", 2, upsert),
+        ("POST /products/bulk/stream", 1, bulk_stream),
+        ("POST /bcg", 6, lambda c, st: ("POST", "/bcg", {"json": pick("bcg")})),
+        ("POST /bcg/columnar", 3, lambda c, st: ("POST", "/bcg/columnar", {"json": cols(pick("bcg"))})),
+        ("POST /swot", 3, lambda c, st: ("POST", "/swot", {"json": pick("swot")})),
+        ("POST /swot/merge", 1, lambda c, st: ("POST", "/swot/merge", {"json": {"units": [pick("swot") for _ in range(20)]}})),
+        ("GET /swot/merge/{id}/search", 1, merge_search),
+        ("POST /ai/suggest-swot", 2, lambda c, st: ("POST", "/ai/suggest-swot", {"json": {"company": "Acme", "industry": "retail", "points": None}})),
+        ("POST /porter", 3, lambda c, st: ("POST", "/porter", {"json": pick("porter")})),
+        ("POST /porter/batch", 2, lambda c, st: ("POST", "/porter/batch", {"json": pick("porter_batch")})),
+        ("POST /simulate", 1, lambda c, st: ("POST", "/simulate", {"json": {"portfolio": cols(pick("bcg")), "n_scenarios": 200,
+                                                                           "growth_shift": {"dist": "normal", "sd": 3}, "seed": 1}})),
+        ("POST /analyze/batch", 1, lambda c, st: ("POST", "/analyze/batch", {"json": {"jobs": [{"kind": "bcg", "payload": pick("bcg")},
+                                                                                              {"kind": "porter", "payload": pick("porter")}]}})),
+        ("POST /snapshots", 3, snapshot),
+        ("GET /snapshots", 3, lambda c, st: ("GET", "/snapshots", {"params": {"summary": "true", "limit": 50}})),
+        ("GET /snapshots/{id}", 2, snap_get),
+        ("GET /snapshots/diff", 1, snap_diff),
+        ("GET /snapshots/trend", 2, lambda c, st: ("GET", "/snapshots/trend", {"params": {"kind": "BCG", "product": "p1", "metric": "rms"}})),
+        ("POST /jobs", 1, lambda c, st: ("POST", "/jobs", {"json": {"kind": "bcg", "payload": pick("bcg")}})),
+        ("GET /jobs/{id}", 1, job_get),
+        ("GET /metrics", 1, lambda c, st: ("GET", "/metrics", {})),
+        ("GET /db-status", 1, lambda c, st: ("GET", "/db-status", {})),
+    ]
+
+
+def _remember(state: dict, method: str, url: str, body) -> None:
+    if method != "POST" or not isinstance(body, dict):
+        return
+    if url == "/snapshots" and "id" in body:
+        state["snapshots"].append(body["id"])
+    elif url == "/swot/merge":
+        state["merges"].append(body["merge_id"])
+    elif url == "/jobs":
+        state["jobs"].append(body["id"])
+
+
+async def drive(args, ids: dict) -> dict:
+    import httpx
+    from app.db import DATABASE_URL, backend_name, probe_primary
+    from app.main import app
+
+    for h in app.router.on_startup:  # no lifespan under ASGITransport
+        r = h()
+        if asyncio.iscoroutine(r):
+            await r
+    if DATABASE_URL and not await probe_primary(attempts=3):
+        raise SystemExit("could not reach DATABASE_URL")
+    rng = random.Random(args.seed)
+    mix = route_mix(ids, rng, args.variants)
+    labels = [m[0] for m in mix]
+    weights = [m[1] for m in mix]
+    builders = dict((m[0], m[2]) for m in mix)
+    plan = rng.choices(labels, weights=weights, k=args.requests)
+    lat: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    state = {"snapshots": [], "merges": [], "jobs": []}
+    queue: asyncio.Queue = asyncio.Queue()
+    for label in plan:
+        queue.put_nowait(label)
+
+    # raise_app_exceptions=False: an unhandled error becomes a 500 and is counted, not fatal
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as c:
+        async def worker():
+            while not queue.empty():
+                label = queue.get_nowait()
+                method, url, kw = builders[label](c, state)
+                t = time.perf_counter()
+                r = await c.request(method, url, **kw)
+                body = r.content
+                lat[label].append((time.perf_counter() - t) * 1000)
+                if r.status_code >= 400:
+                    errors[label] += 1
+                elif r.headers.get("content-type", "").startswith("application/json"):
+                    _remember(state, method, url, json.loads(body))
+
+        t0 = time.perf_counter()
+        try:
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        finally:
+            elapsed = time.perf_counter() - t0
+            for h in app.router.on_shutdown:
+                r = h()
+                if asyncio.iscoroutine(r):
+                    await r
+    backend = backend_name()
+    out = {f"{backend} {k}": {"n": len(v), "errors": errors.get(k, 0), "p50_ms": round(statistics.median(v), 3),
+                              "p99_ms": round(pct(v, 99), 3)} for k, v in sorted(lat.items())}
+    out[f"{backend} total"] = {"requests": args.requests, "errors": sum(errors.values()),
+                               "throughput_per_s": round(args.requests / elapsed, 1), "peak_rss_kb": peak_rss_kb()}
+    return out
+
+
+def child(args) -> None:
+    from app.db import DATABASE_URL, SQLITE_URL
+
+    if args.child == "postgresql" and not DATABASE_URL:
+        raise SystemExit("postgresql child needs DATABASE_URL")
+    rng = random.Random(args.seed)
+    t = time.perf_counter()
+    ids = seed(DATABASE_URL or SQLITE_URL, args.companies, args.markets, args.products, rng)
+    seeded = time.perf_counter() - t
+    results = asyncio.run(drive(args, ids))
+    next(v for k, v in results.items() if k.endswith(" total"))["seed_s"] = round(seeded, 2)
+    print(json.dumps(results))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backend", choices=("sqlite", "postgresql", "both"), default="sqlite")
+    ap.add_argument("--pg-url", default=os.getenv("BENCH_PG_URL"), help="PostgreSQL to load (default: local stand-in)")
+    ap.add_argument("--companies", type=int, default=20)
+    ap.add_argument("--markets", type=int, default=5, help="per company")
+    ap.add_argument("--products", type=int, default=20, help="per market")
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--variants", type=int, default=16, help="distinct bodies per analysis route")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="write results JSON here (see bench.report)")
+    ap.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return child(args)
+
+    argv = [f"--{k}={getattr(args, k)}" for k in ("companies", "markets", "products", "requests", "concurrency", "variants", "seed")]
+    results: Dict[str, dict] = {}
+    if args.backend in ("sqlite", "both"):
+        results.update(run_child("sqlite", None, argv))
+    if args.backend in ("postgresql", "both"):
+        with (contextlib.nullcontext(args.pg_url) if args.pg_url else pg_standin()) as url:
+            if url is None:
+                print("postgresql: skipped (set --pg-url/BENCH_PG_URL, or put initdb/pg_ctl on PATH)", file=sys.stderr)
+            else:
+                results.update(run_child("postgresql", url, argv))
+    write(args.out, "load", results, backend=args.backend, companies=args.companies, markets=args.markets,
+          products=args.products, requests=args.requests, concurrency=args.concurrency, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
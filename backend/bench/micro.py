@@ -0,0 +1,101 @@
+"""Microbenchmarks of the pure analysis services at 1 / 1k / 100k inputs.
+
+Run from backend/:
+    python -m bench.micro --out micro.json
+    python -m bench.micro --sizes 1,1000 --out micro.json   # quicker
+    python -m bench.report compare micro-baseline.json micro.json
+
+Per case: best and median wall time per call (after one warm-up call), items/s, and tracemalloc
+peak of one extra call. Inputs are seeded, so runs are comparable.
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from app.schemas import BCGPoint, MarketCtx, ProductIn, SWOTIn, SuggestSWOTIn
+from app.services.ai_suggest import _uniq, suggest_swot
+from app.services.bcg import classify_bcg
+from app.services.porter import forces_index, score_columns
+from app.services.swot import merge_swots
+
+from .report import write
+
+FORCES = ("supplier", "buyer", "rivalry", "substitutes", "new_entrants")
+WORDS = ("pricing", "pressure", "supply", "chain", "brand", "loyalty", "regulation", "costs", "digital",
+         "channels", "talent", "retention", "entrants", "currency", "risk", "margin", "growth", "share")
+
+
+def _products(rng: random.Random, n: int) -> List[ProductIn]:
+    return [ProductIn(name=f"p{i}", market_share=rng.random(), largest_rival_share=rng.random(),
+                      market_growth_rate=rng.uniform(-20, 40)) for i in range(n)]
+
+
+def _phrases(rng: random.Random, n: int) -> List[str]:
+    # ~1/3 repeats with different case/punctuation, as in merged real-world lists
+    base = [" ".join(rng.sample(WORDS, rng.randint(2, 4))) for _ in range(max(1, n * 2 // 3))]
+    return [rng.choice(base).title() + rng.choice(("", "!", ".")) for _ in range(n)]
+
+
+def cases(n: int, rng: random.Random) -> Dict[str, Callable[[], object]]:
+    """name -> zero-arg callable processing n items; inputs are built here, outside the timing."""
+    products = _products(rng, n)
+    forces = [{k: rng.uniform(1, 5) for k in FORCES} for _ in range(n)]
+    columns = {k: [f[k] for f in forces] for k in FORCES}
+    points = [BCGPoint(name=p.name, rms=p.market_share / max(p.largest_rival_share, 1e-9),
+                       growth=p.market_growth_rate, quadrant="Dog") for p in products]
+    suggest_in = SuggestSWOTIn(company="Acme", industry="retail", points=points,
+                               markets=[MarketCtx(name="m", growth_rate=12.0)])
+    phrases = _phrases(rng, n)
+    units = [SWOTIn(strengths=phrases[i:i + 13], weaknesses=phrases[i + 1:i + 14],
+                    opportunities=phrases[i + 2:i + 15], threats=phrases[i + 3:i + 16])
+             for i in range(max(1, n // 50))]
+    return {
+        "classify_bcg": lambda: classify_bcg(products),
+        "forces_index": lambda: [forces_index(f) for f in forces],
+        "score_columns": lambda: score_columns(columns, n),
+        "suggest_swot": lambda: suggest_swot(suggest_in),
+        "_uniq": lambda: _uniq(phrases),
+        "merge_swots": lambda: merge_swots(units).merged(10),
+    }
+
+
+def measure(fn: Callable[[], object], n: int, min_time: float, max_repeat: int) -> dict:
+    fn()  # warm-up (imports, caches)
+    times: List[float] = []
+    budget = time.perf_counter() + min_time
+    while len(times) < max_repeat and (len(times) < 3 or time.perf_counter() < budget):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best, med = min(times), statistics.median(times)
+    return {"runs": len(times), "best_ms": round(best * 1000, 4), "median_ms": round(med * 1000, 4),
+            "items_per_s": round(n / med) if med > 0 else None, "alloc_peak_kb": round(peak / 1024, 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1,1000,100000")
+    ap.add_argument("--only", default=None, help="comma-separated case names")
+    ap.add_argument("--min-time", type=float, default=0.5, help="seconds of timed calls per case")
+    ap.add_argument("--max-repeat", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="write results JSON here (see bench.report)")
+    args = ap.parse_args()
+    only = set(args.only.split(",")) if args.only else None
+    results = {}
+    for n in (int(s) for s in args.sizes.split(",")):
+        for name, fn in cases(n, random.Random(args.seed)).items():
+            if only is None or name in only:
+                results[f"{name}[{n}]"] = measure(fn, n, args.min_time, args.max_repeat)
+    write(args.out, "micro", results, sizes=args.sizes, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Reproducible check of read-replica routing (app/replica.py) against two local SQLite files.
+
+Run from backend/ (needs httpx):
+    python -m bench.replica
+
+A scratch directory holds the primary (snapshots.db) and the replica (replica.db). "Replication" is
+an explicit copy of the primary (sqlite3 backup), so the replica is stale until the script syncs it.
+That makes it visible which database answered each read. The app runs in process over
+httpx.ASGITransport. Each client keeps its own cookies, like a browser. Health checks are triggered
+directly instead of waiting for REPLICA_CHECK_INTERVAL.
+
+Steps:
+  routing      a client with no cookie reads from the (stale) replica
+  sticky       the writing client gets the db_primary_until cookie and reads its write from the primary
+  expiry       once REPLICA_STICKY_SECONDS pass, that client reads from the replica again
+  down         replica unopenable: the read falls back to the primary and the replica is marked down
+  lagging      replica reports lag past REPLICA_MAX_LAG_SECONDS: reads go to the primary (SQLite has
+               no replay lag, so the probe's result is overridden here; PostgreSQL measures it)
+  recovered    a passing check routes reads to the replica again
+
+Prints one line per step and exits 1 if any step fails.
+"""
+import asyncio
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STICKY_SECONDS = 1.0
+
+
+def _sync(primary: str, replica: str) -> None:
+    """Stand-in for replication: a consistent copy of the primary."""
+    with sqlite3.connect(primary) as src, sqlite3.connect(replica) as dst:
+        src.backup(dst)
+
+
+async def _run(workdir: str) -> bool:
+    import httpx
+    from app.db import get_engine
+    from app.main import app
+    from app.replica import STICKY_COOKIE, replica
+
+    primary_path, replica_path = os.path.join(workdir, "snapshots.db"), os.path.join(workdir, "replica.db")
+    get_engine()  # creates the primary schema
+    _sync(primary_path, replica_path)
+    for h in app.router.on_startup:  # no lifespan under ASGITransport
+        await h()
+
+    failures = []
+
+    def step(name: str, ok: bool, detail: str) -> None:
+        print(f"{'PASS' if ok else 'FAIL'}  {name:<10} {detail}")
+        if not ok:
+            failures.append(name)
+
+    async def names(client) -> tuple:
+        """Company names one client sees, and whether the replica served them."""
+        before = replica.reads
+        r = await client.get("/companies")
+        r.raise_for_status()
+        return {c["name"] for c in r.json()}, replica.reads > before
+
+    transport = httpx.ASGITransport(app=app)
+    writer = httpx.AsyncClient(transport=transport, base_url="http://replica-check")
+    reader = httpx.AsyncClient(transport=transport, base_url="http://replica-check")
+    try:
+        r = await writer.post("/companies", json={"name": "Acme", "industry": "Tools"})
+        r.raise_for_status()
+
+        seen, on_replica = await names(reader)
+        step("routing", on_replica and "Acme" not in seen, f"reader on replica={on_replica}, sees Acme={'Acme' in seen}")
+
+        seen, on_replica = await names(writer)
+        step("sticky", STICKY_COOKIE in writer.cookies and not on_replica and "Acme" in seen,
+             f"cookie={STICKY_COOKIE in writer.cookies}, writer on replica={on_replica}, sees Acme={'Acme' in seen}")
+
+        await asyncio.sleep(STICKY_SECONDS + 0.2)
+        _, on_replica = await names(writer)
+        step("expiry", on_replica, f"writer on replica={on_replica} after {STICKY_SECONDS}s")
+
+        # Unopenable replica: move the file aside, put a directory in its place, drop pooled connections
+        os.replace(replica_path, replica_path + ".bak")
+        os.mkdir(replica_path)
+        await replica.engine.dispose()
+        seen, on_replica = await names(reader)
+        step("down", not on_replica and "Acme" in seen and not replica.healthy,
+             f"reader on replica={on_replica}, replica healthy={replica.healthy} "
+             f"({(replica.last_error or '').splitlines()[0]})")
+
+        os.rmdir(replica_path)
+        _sync(primary_path, replica_path)
+        await replica.engine.dispose()
+        probe = replica._probe
+
+        async def lagging_probe():
+            await probe()
+            return 10.0
+        replica._probe = lagging_probe
+        await replica.check()
+        _, on_replica = await names(reader)
+        status = (await reader.get("/db-status")).json()
+        step("lagging", not on_replica and not status["replica_healthy"],
+             f"reader on replica={on_replica}, /db-status: {status['replica_last_error']}")
+
+        replica._probe = probe
+        await replica.check()
+        seen, on_replica = await names(reader)
+        step("recovered", on_replica and "Acme" in seen, f"reader on replica={on_replica}, sees Acme={'Acme' in seen}")
+    finally:
+        await writer.aclose()
+        await reader.aclose()
+        for h in app.router.on_shutdown:
+            await h()
+    return not failures
+
+
+def main() -> int:
+    workdir = tempfile.mkdtemp(prefix="replica-check-")
+    try:
+        os.chdir(workdir)  # the SQLite primary is ./snapshots.db
+        os.environ.pop("DATABASE_URL", None)
+        os.environ.update({
+            "DATABASE_REPLICA_URL": f"sqlite:///{os.path.join(workdir, 'replica.db')}",
+            "REPLICA_STICKY_SECONDS": str(STICKY_SECONDS),
+            "REPLICA_CHECK_INTERVAL": "3600",  # checks are run explicitly
+            "CACHE_BACKEND_URL": "",
+        })
+        sys.path.insert(0, BACKEND_DIR)
+        ok = asyncio.run(_run(workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("replica routing: OK" if ok else "replica routing: FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
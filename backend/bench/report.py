@@ -0,0 +1,109 @@
+"""Machine-readable benchmark results and comparison against a saved baseline.
+
+A results file is JSON: {"suite", "meta", "results": {case: {metric: number}}}. Metric names carry
+their direction: *_per_s is higher-is-better; *_ms, *_us and *_kb are lower-is-better. Other metrics
+are informational.
+
+    python -m bench.report compare baseline.json current.json --threshold 0.10
+exits 1 when any metric regressed by more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+HIGHER = ("_per_s",)
+LOWER = ("_ms", "_us", "_kb")
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process (None where `resource` is unavailable, e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # bytes on macOS, KiB on Linux
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def meta(**args) -> dict:
+    return {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "git_rev": _git_rev(),
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "args": args}
+
+
+def write(path: Optional[str], suite: str, results: Dict[str, dict], **args) -> dict:
+    doc = {"suite": suite, "meta": meta(**args), "results": results}
+    text = json.dumps(doc, indent=2, sort_keys=True)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return doc
+
+
+def _direction(metric: str) -> int:
+    if metric.endswith(HIGHER):
+        return 1
+    if metric.endswith(LOWER):
+        return -1
+    return 0
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> Tuple[List[dict], bool]:
+    """One row per metric present in both files; `regressed` when worse by more than `threshold`."""
+    rows, failed = [], False
+    for case, metrics in sorted(baseline["results"].items()):
+        for metric, old in sorted(metrics.items()):
+            new = current["results"].get(case, {}).get(metric)
+            d = _direction(metric)
+            if d == 0 or not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or old == 0:
+                continue
+            change = (new - old) / abs(old)
+            regressed = d * change < -threshold
+            failed |= regressed
+            rows.append({"case": case, "metric": metric, "baseline": old, "current": new,
+                         "change_pct": round(change * 100, 1), "regressed": regressed})
+    return rows, failed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    cmp_ = sub.add_parser("compare")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression (0.10 = 10%%)")
+    args = ap.parse_args()
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows, failed = compare(baseline, current, args.threshold)
+    width = max([len(f"{r['case']} {r['metric']}") for r in rows] + [10])
+    for r in rows:
+        flag = "  REGRESSED" if r["regressed"] else ""
+        print(f"{r['case'] + ' ' + r['metric']:<{width}}  {r['baseline']:>12g} -> {r['current']:>12g}  {r['change_pct']:+7.1f}%{flag}")
+    print(f"{sum(r['regressed'] for r in rows)} of {len(rows)} metrics regressed beyond {args.threshold:.0%}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Throughput of the CPU-bound POST /bcg path with 1..N gunicorn workers.
+
+Run from backend/ (needs gunicorn and httpx):
+    python -m bench.scaling --workers 1,2,4 --out scaling.json
+    python -m bench.report compare scaling-baseline.json scaling.json
+
+For each worker count, gunicorn.conf.py is started on a free port in a scratch directory, with the
+result cache off so every request computes. Client processes (--clients, default 2x the largest
+worker count) then post one --products-item portfolio in a closed loop for --duration seconds,
+after a --warmup. Clients share the machine with the server, so scaling flattens once workers plus
+clients exceed the cores. Measure up to about half the cores for a clean curve.
+
+Results: "workers=<n>": throughput_per_s, p50_ms, p99_ms, plus speedup and efficiency versus 1 worker.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+from .report import pct, write
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _body(n: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    return json.dumps([{"name": f"p{i}", "market_share": rng.random(), "largest_rival_share": rng.random(),
+                        "market_growth_rate": rng.uniform(-20, 40)} for i in range(n)]).encode()
+
+
+def _client(args) -> List[float]:
+    """One closed-loop client: latencies (s) of requests that finished OK between warm-up end and deadline."""
+    import httpx
+    url, body, start, deadline = args
+    out: List[float] = []
+    with httpx.Client(timeout=30, headers={"content-type": "application/json"}) as c:
+        while True:
+            t = time.time()
+            if t >= deadline:
+                return out
+            r = c.post(url, content=body)
+            if r.status_code == 200 and t >= start:
+                out.append(time.time() - t)
+
+
+def _serve(workers: int, port: int, cwd: str) -> subprocess.Popen:
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR, "WEB_CONCURRENCY": str(workers), "PORT": str(port),
+           "CACHE_ENABLED": "false", "CACHE_BACKEND_URL": ""}
+    env.pop("DATABASE_URL", None)
+    return subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"),
+                             "--bind", f"127.0.0.1:{port}", "app.main:app"],
+                            cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _wait_ready(base: str, timeout: float = 60.0) -> None:
+    import httpx
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {base} not ready after {timeout}s")
+
+
+def run(workers: int, clients: int, body: bytes, warmup: float, duration: float) -> dict:
+    port = _free_port()
+    with tempfile.TemporaryDirectory(prefix="bench-scaling-") as cwd:
+        server = _serve(workers, port, cwd)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            _wait_ready(base)
+            start = time.time() + warmup
+            deadline = start + duration
+            with multiprocessing.Pool(clients) as pool:
+                lat = [x for part in pool.map(_client, [(f"{base}/bcg", body, start, deadline)] * clients) for x in part]
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+    if not lat:
+        raise RuntimeError(f"no successful requests with {workers} workers")
+    return {"requests": len(lat), "throughput_per_s": round(len(lat) / duration, 1),
+            "p50_ms": round(pct(lat, 50) * 1000, 2), "p99_ms": round(pct(lat, 99) * 1000, 2)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", default=None, help="comma-separated worker counts (default: 1,2,4.. up to the cores)")
+    ap.add_argument("--clients", type=int, default=None, help="client processes (default: 2x the largest worker count)")
+    ap.add_argument("--products", type=int, default=2000, help="portfolio size per request")
+    ap.add_argument("--warmup", type=float, default=2.0)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="write results JSON here (see bench.report)")
+    args = ap.parse_args()
+    if args.workers:
+        counts = [int(x) for x in args.workers.split(",")]
+    else:
+        cores = os.cpu_count() or 1
+        counts = sorted({1, cores} | {2 ** i for i in range(1, cores.bit_length()) if 2 ** i < cores})
+    clients = args.clients or 2 * max(counts)
+    body = _body(args.products, args.seed)
+    results = {}
+    for n in counts:
+        results[f"workers={n}"] = run(n, clients, body, args.warmup, args.duration)
+        print(f"workers={n}: {results[f'workers={n}']}", file=sys.stderr)
+    base = results[f"workers={counts[0]}"]["throughput_per_s"] / counts[0]
+    for n in counts:
+        r = results[f"workers={n}"]
+        r["speedup"] = round(r["throughput_per_s"] / base, 2)
+        r["efficiency"] = round(r["throughput_per_s"] / (base * n), 2)
+    write(args.out, "scaling", results, workers=counts, clients=clients, products=args.products,
+          duration=args.duration, cpus=os.cpu_count())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Rows/sec for list_products-style serialization: legacy model path vs the fast JSON path.
+
+Run from backend/:
+    python -m bench.serialize --rows 10000 --repeat 5
+
+legacy: ORM entities -> ProductOut per row (Decimal->float by hand) -> FastAPI-style
+        response_model validation -> jsonable_encoder -> json.dumps
+fast:   Core tuples (numerics cast in SQL) -> fastjson.encode_rows
+"""
+import argparse
+import json
+import time
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.db import Base
+from app.fastjson import encode_rows
+from app.main import PRODUCT_COLS, _keys
+from app.models import Product
+from app.schemas import ProductOut
+
+
+def seed(engine, n: int) -> None:
+    Base.metadata.create_all(engine)
+    cid = uuid.uuid4()
+    with Session(engine) as s:
+        s.execute(insert(Product), [
+            {"id": uuid.uuid4(), "company_id": cid, "name": f"product-{i:07d}", "market_share": 0.1234,
+             "largest_rival_share": 0.25, "price": 19.99, "revenue": 123456.78}
+            for i in range(n)
+        ])
+        s.commit()
+
+
+def legacy(engine) -> bytes:
+    adapter = TypeAdapter(list[ProductOut])
+    with Session(engine) as s:
+        rows = s.scalars(select(Product).order_by(Product.name, Product.id)).all()
+        out = [ProductOut(
+            id=str(r.id),
+            company_id=str(r.company_id) if r.company_id else None,
+            market_id=str(r.market_id) if r.market_id else None,
+            name=r.name,
+            market_share=float(r.market_share) if r.market_share is not None else None,
+            largest_rival_share=float(r.largest_rival_share) if r.largest_rival_share is not None else None,
+            price=float(r.price) if r.price is not None else None,
+            revenue=float(r.revenue) if r.revenue is not None else None,
+        ) for r in rows]
+        validated = adapter.validate_python([o.model_dump() for o in out])  # response_model pass
+        return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast(engine) -> bytes:
+    with engine.connect() as conn:
+        rows = conn.execute(select(*PRODUCT_COLS).order_by(Product.name, Product.id)).all()
+        return encode_rows(rows, _keys(PRODUCT_COLS))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    engine = create_engine("sqlite://")
+    seed(engine, args.rows)
+    assert json.loads(legacy(engine)) == json.loads(fast(engine))
+    results = {}
+    for name, fn in (("legacy", legacy), ("fast", fast)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            fn(engine)
+            best = min(best, time.perf_counter() - t)
+        results[name] = {"best_s": round(best, 4), "rows_per_s": round(args.rows / best)}
+    results["speedup"] = round(results["legacy"]["best_s"] / results["fast"]["best_s"], 2)
+    print(json.dumps({"rows": args.rows, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Check that GET /snapshots and GET /snapshots/{id} encode the same row to the same bytes.
+
+Run from backend/ (needs httpx):
+    python -m bench.snapshot_encoding
+
+The listing splices payloads in as JSON bytes (app/fastjson.py) while the detail endpoint goes through
+SnapshotOut, so the two encoders can drift apart: datetime suffixes ("Z" vs "+00:00"), JSONB::text
+spacing on PostgreSQL, float and non-ASCII formatting. Both responses list the fields in the same order,
+so the listing must equal "[" + the detail bodies joined by "," + "]", byte for byte.
+
+Uses a scratch SQLite file unless DATABASE_URL is set (point it at PostgreSQL to check JSONB).
+Prints the first mismatching row, if any, and exits 1 on a mismatch.
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Payloads that tend to encode differently: key order, nesting, floats, non-ASCII, nulls
+PAYLOADS = [
+    {"zeta": 1, "a": 2, "mid": [3, 4]},
+    {"items": [{"name": "R&D — Café ☕", "share": 0.1, "growth": -0.07}], "note": None, "ok": True},
+    {"big": 12345678901234567890, "tiny": 1e-7, "huge": 1e16, "third": 1 / 3},
+    {"nested": {"b": {"c": [1, {"d": "e"}]}, "a": []}, "empty": {}},
+    {"quote": "say \"hi\"\n\ttab", "slash": "a/b\\c"},
+]
+
+
+async def _run() -> bool:
+    import httpx
+    from app.db import get_engine
+    from app.main import app
+
+    get_engine()  # creates the schema on the SQLite fallback
+    for h in app.router.on_startup:  # no lifespan under ASGITransport
+        await h()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://encoding-check") as c:
+            for p in PAYLOADS:
+                r = await c.post("/snapshots", json={"kind": "BCG", "payload": p, "note": "encoding check"})
+                r.raise_for_status()
+            # Newest first: the page holds the rows just written (and, on a shared database, maybe others)
+            r = await c.get("/snapshots", params={"kind": "BCG", "limit": len(PAYLOADS)})
+            r.raise_for_status()
+            listing = r.content
+            details = []
+            for row in r.json():
+                d = await c.get(f"/snapshots/{row['id']}")
+                d.raise_for_status()
+                details.append(d.content)
+    finally:
+        for h in app.router.on_shutdown:
+            await h()
+
+    expected = b"[" + b",".join(details) + b"]"
+    if listing == expected:
+        print(f"PASS  {len(details)} rows: list and detail bytes match")
+        return True
+    pos = 1
+    for d in details:
+        got = listing[pos:pos + len(d)]
+        if got != d:
+            print(f"FAIL  list:   {got.decode('utf-8', 'replace')}")
+            print(f"      detail: {d.decode('utf-8', 'replace')}")
+            break
+        pos += len(d) + 1
+    else:
+        print("FAIL  list and detail differ in length or framing")
+    return False
+
+
+def main() -> int:
+    workdir = None
+    if not os.getenv("DATABASE_URL"):
+        workdir = tempfile.mkdtemp(prefix="encoding-check-")
+        os.chdir(workdir)  # the SQLite primary is ./snapshots.db
+    os.environ["CACHE_BACKEND_URL"] = ""
+    sys.path.insert(0, BACKEND_DIR)
+    try:
+        ok = asyncio.run(_run())
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    print("snapshot encoding: OK" if ok else "snapshot encoding: FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Cold-start cost of a worker: fresh interpreter -> `import app.main` -> startup handlers done.
+
+Run from backend/:
+    python -m bench.startup --runs 5
+    DATABASE_URL=postgresql://u:p@10.255.255.1:5432/x python -m bench.startup   # unreachable primary
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+async def boot():
+    for h in app.main.app.router.on_startup:
+        r = h()
+        if asyncio.iscoroutine(r):
+            await r
+    t2 = time.perf_counter()
+    for h in app.main.app.router.on_shutdown:
+        r = h()
+        if asyncio.iscoroutine(r):
+            await r
+    return t2
+t2 = asyncio.run(boot())
+print(json.dumps({"import_s": t1 - t0, "ready_s": t2 - t0}))
+"""
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", CHILD], cwd=here, capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    summary = {
+        k: {"median": round(statistics.median(s[k] for s in samples), 4), "max": round(max(s[k] for s in samples), 4)}
+        for k in ("import_s", "ready_s")
+    }
+    print(json.dumps({"runs": args.runs, "database_url": bool(os.getenv("DATABASE_URL")), **summary}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Production launcher: N uvicorn workers under gunicorn.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+WEB_CONCURRENCY workers (default: the CPUs this container may use), listening on $PORT. The worker
+count is exported to the workers so the DB pool budget (DB_MAX_CONNECTIONS) is split between them.
+Workers import the app after the fork by default. With PRELOAD_APP=1 the master imports it once
+(faster boot, shared pages) and post_fork drops anything inherited that holds connections.
+
+SIGTERM drains: listeners close, in-flight requests and running jobs get up to GRACEFUL_TIMEOUT
+seconds (jobs: SHUTDOWN_DRAIN_SECONDS of it), then the lifespan shutdown re-queues what is left.
+"""
+import math
+import os
+
+
+def _cores() -> int:
+    """CPUs usable here: the cgroup v2 quota when set (containers), else the affinity mask."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+workers = int(os.getenv("WEB_CONCURRENCY") or _cores())
+os.environ["WEB_CONCURRENCY"] = str(workers)  # read by app.config in every worker
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "app.gunicorn_worker.UvicornWorker"
+preload_app = os.getenv("PRELOAD_APP", "").lower() in ("1", "true", "yes")
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))  # a worker silent this long is restarted
+keepalive = 5
+accesslog = os.getenv("ACCESS_LOG") or None
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app.main import after_fork
+        after_fork()